@@ -1,5 +1,6 @@
 import uvicorn
 import asyncio
+import logging
 from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Depends
 from contextlib import asynccontextmanager
 from pydantic import BaseModel
@@ -18,13 +19,20 @@ from edith.services.notification.service import NotificationService
 from edith.services.email.rag import EmailRAGSystem
 from edith.services.email.filter.filter import EmailFilter
 from edith.services.security.guard import PromptGuard
+from edith.lib.shared.llm.spam_service import SpamLLMService
+from edith.lib.shared.log import setup_queue_logging, stop_queue_logging
 
 from edith.dependencies import *
 
+logger = logging.getLogger(__name__)
+
 # --- Lifecycle Events ---
 @asynccontextmanager
 async def startup_event(app: FastAPI):
     
+    # Log records are formatted and written on a background thread, off the request path
+    setup_queue_logging()
+    
     # Ensure configurations are initialized
     app.state.config = EmailAssistantConfig()
     
@@ -36,7 +44,7 @@ async def startup_event(app: FastAPI):
         # --- Global Services ---
         # Initialize Fetcher based on configuration
         if app.state.config.use_mock_data:
-            print("🎭 STARTING IN DEMO MODE (Mock Data)")
+            logger.info("🎭 STARTING IN DEMO MODE (Mock Data)")
             app.state.email_fetcher = DummyEmailFetcher(app.state.config)
             app.state.calendar_service = DummyCalendarService()
         else:
@@ -46,7 +54,7 @@ async def startup_event(app: FastAPI):
         # authenticate (only for real services)
         if not app.state.config.use_mock_data:
             if app.state.email_fetcher.authenticate():
-                print("Email Service authenticated.")
+                logger.info("Email Service authenticated.")
         
         app.state.notification_service = NotificationService(app.state.calendar_service)
         
@@ -54,15 +62,19 @@ async def startup_event(app: FastAPI):
         # This allows spam filtering in mock mode if desired, but gracefully skips if not configured
         if app.state.config.hf_token and app.state.config.spam_detection_model_id:
             try:
-                app.state.email_filter = EmailFilter(app.state.config)
-                print("📧 Spam filter initialized")
+                # Load the spam model once; every request shares this instance
+                app.state.spam_service = SpamLLMService(app.state.config)
+                app.state.email_filter = EmailFilter(app.state.config, spam_service=app.state.spam_service)
+                logger.info("📧 Spam filter initialized")
             except Exception as e:
-                print(f"⚠️ Spam filter initialization failed: {e}")
+                logger.warning("⚠️ Spam filter initialization failed: %s", e)
+                app.state.spam_service = None
                 app.state.email_filter = None
         else:
+            app.state.spam_service = None
             app.state.email_filter = None
             if not app.state.config.use_mock_data:
-                print("⚠️ Spam filter disabled (HF_TOKEN or model IDs not configured)")
+                logger.warning("⚠️ Spam filter disabled (HF_TOKEN or model IDs not configured)")
         
         app.state.prompt_guard = PromptGuard()
         
@@ -77,22 +89,24 @@ async def startup_event(app: FastAPI):
             user_email = app.state.email_fetcher.get_profile_email()
             app.state.config.add_email_account(user_email, is_primary=True)
             app.state.calendar_service.authenticate(app.state.email_fetcher.creds)
-            print("Calendar authenticated.")
+            logger.info("Calendar authenticated.")
             notification_service_task = asyncio.create_task(app.state.notification_service.start_monitoring())
         yield
     except Exception as e:
-        print(f"Startup authentication warning: {e}")
+        logger.warning("Startup authentication warning: %s", e)
     finally:
         app.state.email_fetcher = None
         app.state.calendar_service = None
         app.state.notification_service = None
         app.state.email_filter = None
+        app.state.spam_service = None
         app.state.rag_system = None
         app.state.prompt_guard = None
-        print('Services has been shutdown.')
+        logger.info('Services has been shutdown.')
         if notification_service_task:
             notification_service_task.cancel()
-        print('Notification monitoring service shutting down...')
+        logger.info('Notification monitoring service shutting down...')
+        stop_queue_logging()
 
 app = FastAPI(
     title="Edith API",
@@ -170,12 +184,11 @@ async def sync_emails(background_tasks: BackgroundTasks, email_fetcher: EmailFet
         raise HTTPException(status_code=401, detail="Service not authenticated")
 
     def process_sync():
-        print("Starting background sync...")
+        logger.info("Starting background sync...")
         system_status.sync_state = "syncing"
         system_status.sync_progress = 0
         system_status.sync_message = "Starting sync..."
         
-        page_token = None
         total_fetched = 0
         
         # Target: 1 month back
@@ -184,33 +197,34 @@ async def sync_emails(background_tasks: BackgroundTasks, email_fetcher: EmailFet
         MAX_EMAILS = 500
         
         try:
-            while True:
-                if total_fetched >= MAX_EMAILS:
-                    break
-
-                emails, next_token = email_fetcher.get_emails(max_results=50, query=query, page_token=page_token)
-                if not emails:
-                    break
-                
-                # Zero Trust Ingestion: Filter unsafe content
-                safe_emails = []
-                for email in emails:
-                    if prompt_guard.validate(email.subject + " " + email.body):
-                        safe_emails.append(email)
-                    else:
-                        print(f"   🛡️ Security Alert: Dropped email '{email.subject[:30]}...' at ingestion.")
-                
-                total_fetched += len(safe_emails)
+            # Batches stream in as they download, so filtering/indexing overlaps with fetching.
+            # Only headers + snippet are downloaded up front; full bodies are fetched for the
+            # emails that survive filtering.
+            for emails in email_fetcher.iter_emails(query=query, page_size=50, headers_only=True):
+                total_fetched += len(emails)
                 system_status.sync_message = f"Fetched {total_fetched} emails..."
                 
                 # Filter relevant emails if email_filter is available
                 if email_filter:
-                    relevant = email_filter.filter_relevant_emails(safe_emails)
+                    relevant = email_filter.filter_relevant_emails(emails)
                 else:
-                    relevant = safe_emails  # In mock mode without filter
+                    relevant = emails  # In mock mode without filter
+                
+                relevant = email_fetcher.hydrate_bodies(relevant)
+                # The screening above only saw the snippet: re-check the full bodies
+                if email_filter:
+                    relevant = email_filter.filter_hydrated_emails(relevant)
+                
+                # Zero Trust Ingestion: Filter unsafe content (on the full body)
+                safe_emails = []
+                for email in relevant:
+                    if prompt_guard.validate(email.subject + " " + email.body):
+                        safe_emails.append(email)
+                    else:
+                        logger.warning("🛡️ Security Alert: Dropped email '%s...' at ingestion.", email.subject[:30])
                     
-                if relevant:
-                    rag_system.index_emails(relevant)
+                if safe_emails:
+                    rag_system.index_emails(safe_emails)
                     
                 system_status.sync_progress = total_fetched
                 
@@ -223,17 +237,16 @@ async def sync_emails(background_tasks: BackgroundTasks, email_fetcher: EmailFet
                     if oldest_date < readiness_date:
                         system_status.is_ready = True
                 
-                page_token = next_token
-                if not page_token:
+                if total_fetched >= MAX_EMAILS:
                     break
             
             system_status.sync_state = "completed"
             system_status.sync_message = f"Sync complete. Processed {total_fetched} emails."
             system_status.is_ready = True
-            print(f"Sync complete. Total fetched: {total_fetched}")
+            logger.info("Sync complete. Total fetched: %d", total_fetched)
             
         except Exception as e:
-            print(f"Sync error: {e}")
+            logger.exception("Sync error: %s", e)
             system_status.sync_state = "error"
             system_status.sync_message = f"Error: {str(e)}"
 
@@ -243,11 +256,12 @@ async def sync_emails(background_tasks: BackgroundTasks, email_fetcher: EmailFet
 @app.post("/ask-question")
 async def ask_question(request: QuestionRequest, rag_system: EmailRAGSystem = Depends(get_rag_system), calendar_service: CalendarService = Depends(get_calendar_service)):
     calendar_context = ""
-    events = calendar_service.get_events(days_ahead=7)
+    # Blocking Calendar API call, kept off the event loop
+    events = await asyncio.to_thread(calendar_service.get_events, days_ahead=7)
     if events:
         calendar_context = format_calendar_events(events)
     
-    response = rag_system.answer_question(request.question, additional_context=calendar_context, return_sources=True)
+    response = await rag_system.answer_question_async(request.question, additional_context=calendar_context, return_sources=True)
     if isinstance(response, dict):
         return {
             "question": request.question, 
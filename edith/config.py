@@ -19,10 +19,21 @@ class EmailAssistantConfig:
         self.encryption_key = os.getenv("EDITH_ENCRYPTION_KEY")
         self.chroma_server_host = os.getenv("CHROMA_SERVER_HOST")
         self.chroma_server_port = int(os.getenv("CHROMA_SERVER_PORT", 8000))
+        # Keep the vector DB in process memory only (nothing written to disk), e.g. for offline tests
+        self.chroma_in_memory = os.getenv("CHROMA_IN_MEMORY", "false").lower() == "true"
         
         self.spam_detection_model_id = os.getenv("SPAM_DETECTION_MODEL_ID")
         self.spam_zs_detection_model_id = os.getenv("SPAM_ZS_DETECTION_MODEL_ID")
+        # Dynamic INT8 quantization of the spam classifier (CPU only)
+        self.spam_model_quantize = os.getenv("SPAM_MODEL_QUANTIZE", "false").lower() == "true"
         self.hf_token = os.getenv('HF_TOKEN')
+        # Optional sentence-transformers model for RAG embeddings (default: Chroma's ONNX MiniLM)
+        self.embedding_model = os.getenv("EMBEDDING_MODEL")
+        self.embedding_device = os.getenv("EMBEDDING_DEVICE")
+        # Optional SQLite file caching embeddings across runs (disabled when unset)
+        self.embedding_cache_path = os.getenv("EMBEDDING_CACHE_PATH")
+        # Summarize clusters of similar retrieved emails before prompting (fewer prompt tokens, extra LLM calls)
+        self.rag_cluster_context = os.getenv("RAG_CLUSTER_CONTEXT", "false").lower() == "true"
 
         
         # Environment Configuration
@@ -3,8 +3,22 @@ from edith.lib.shared.llm.constants import EMAIL_FEW_SHOT_HYPOTHESIS, EMAIL_FEW_
 from edith.config import EmailAssistantConfig
 
 import torch
+import hashlib
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List, Literal
+from typing import List, Literal, Optional
+
+# Largest micro-batch sent through the model in one forward pass
+MAX_BATCH_SIZE = 32
+# On GPU, sequence lengths are rounded up to a multiple of this (128/256/384/512),
+# so the compiled model only ever sees a handful of input shapes
+PAD_LENGTH_MULTIPLE = 128
+# Batch sizes warmed up per length bucket at startup (single emails and full micro-batches);
+# on GPU, partial micro-batches are padded up to the next one
+WARMUP_BATCH_SIZES = (1, MAX_BATCH_SIZE)
+# Number of classified texts remembered across syncs (least recently used are evicted first)
+RESULT_CACHE_SIZE = 10_000
 
 @dataclass
 class SpamLLMResult:
@@ -15,41 +29,112 @@ class SpamLLMResult:
 class SpamLLMService:
     def __init__(self, config: EmailAssistantConfig):
         self.device = get_device()
-        self.model, self.tokenizer = get_llm_provider(config.spam_detection_model_id, config.hf_token)
+        self.model, self.tokenizer = get_llm_provider(config.spam_detection_model_id, config.hf_token, quantize=config.spam_model_quantize)
         self.classifier = get_llm_provider_pipeline(config.spam_zs_detection_model_id, config.hf_token)
+        # Only the compiled (GPU) model benefits from bucketed shapes; CPU pads to the longest text
+        self.pad_to_multiple_of = PAD_LENGTH_MULTIPLE if self.device.type == "cuda" else None
+        # content hash -> result, so re-synced emails skip tokenization and inference
+        self._results_cache: OrderedDict[bytes, SpamLLMResult] = OrderedDict()
+        # The service is shared by concurrent sync tasks, so cache access is serialized
+        self._results_lock = threading.Lock()
+        
+        if self.device.type == "cuda":
+            self._warmup()
         
     def detect_spam(self, texts: list[str]) -> List[SpamLLMResult]:
         """Detect whether the texts are spam or not using DistillBERT (dima806/email-spam-detection-roberta)"""
-        # tokenize the inputs
         try:
-            inputs = self.tokenizer(
-                texts,
-                padding=True,
-                truncation=True,
-                max_length=512,
-                return_tensors="pt"
-            )
-            # convert inputs to "CUDA" if using GPU
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                probs = torch.softmax(outputs.logits, dim=-1)
-                
             # label mapping from the model config
             id_map = getattr(self.model.config, "id2label", {0: "No spam", 1: "Spam"})  # {0: "ham", 1: "spam"}
-            pred_ids = probs.argmax(dim=-1).tolist()
             
-            results: List[SpamLLMResult] = []
-            for i, pred_id in enumerate(pred_ids):
-                label = id_map[int(pred_id)]
-                score = float(probs[i, pred_id])
-                results.append(SpamLLMResult(label=label, score=score))
+            # serve previously seen texts from the cache, only the rest go through the model
+            keys = [self._cache_key(text) for text in texts]
+            results: List[Optional[SpamLLMResult]] = [self._cache_get(key) for key in keys]
+            uncached = [i for i, result in enumerate(results) if result is None]
+            
+            # sort by length so each micro-batch only pads up to similarly sized texts,
+            # then scatter the predictions back into the original order
+            order = sorted(uncached, key=lambda i: len(texts[i]))
+            
+            for start in range(0, len(order), MAX_BATCH_SIZE):
+                chunk = order[start:start + MAX_BATCH_SIZE]
+                probs = self._classify([texts[i] for i in chunk])
+                pred_ids = probs.argmax(dim=-1).tolist()
+                
+                for row, (i, pred_id) in enumerate(zip(chunk, pred_ids)):
+                    label = id_map[int(pred_id)]
+                    score = float(probs[row, pred_id])
+                    results[i] = SpamLLMResult(label=label, score=score)
+                    self._cache_put(keys[i], results[i])
 
             return results
         except Exception as e:
             raise Exception(f"spam_service.detect_spam - Error trying to classify text as spam: {e}")
     
+    def _classify(self, texts: List[str]) -> torch.Tensor:
+        """Runs one forward pass over a micro-batch and returns the class probabilities"""
+        count = len(texts)
+        if self.device.type == "cuda":
+            # pad the batch with empty texts up to the nearest warmed batch size, so partial
+            # micro-batches replay a recorded graph instead of triggering a recompile
+            batch_size = next(size for size in WARMUP_BATCH_SIZES if size >= count)
+            texts = texts + [""] * (batch_size - count)
+        
+        # tokenize the inputs, padding only to the longest text in this micro-batch
+        # (rounded up to the next length bucket on GPU)
+        inputs = self.tokenizer(
+            texts,
+            padding="longest",
+            truncation=True,
+            max_length=512,
+            pad_to_multiple_of=self.pad_to_multiple_of,
+            return_tensors="pt"
+        )
+        # convert inputs to "CUDA" if using GPU
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        
+        with torch.inference_mode():
+            outputs = self.model(**inputs)
+        
+        return torch.softmax(outputs.logits[:count], dim=-1)
+    
+    def _warmup(self):
+        """
+        Compiles the model and records its CUDA graphs for the common (batch, length) buckets
+        at startup, so the first real requests replay a graph instead of paying for the capture
+        """
+        for seq_len in range(PAD_LENGTH_MULTIPLE, 512 + 1, PAD_LENGTH_MULTIPLE):
+            for batch_size in WARMUP_BATCH_SIZES:
+                inputs = self.tokenizer(
+                    ["warmup"] * batch_size,
+                    padding="max_length",
+                    max_length=seq_len,
+                    return_tensors="pt"
+                )
+                inputs = {k: v.to(self.device) for k, v in inputs.items()}
+                # the first runs compile and warm up, the following one records the graph
+                for _ in range(3):
+                    with torch.inference_mode():
+                        self.model(**inputs)
+        torch.cuda.synchronize()
+    
+    def _cache_key(self, text: str) -> bytes:
+        """Compact content hash of the text (not security-sensitive, so a 128-bit blake2b digest is plenty)"""
+        return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    
+    def _cache_get(self, key: bytes) -> Optional[SpamLLMResult]:
+        with self._results_lock:
+            result = self._results_cache.get(key)
+            if result is not None:
+                self._results_cache.move_to_end(key)
+            return result
+    
+    def _cache_put(self, key: bytes, result: SpamLLMResult):
+        with self._results_lock:
+            self._results_cache[key] = result
+            if len(self._results_cache) > RESULT_CACHE_SIZE:
+                self._results_cache.popitem(last=False)
+    
     def detect_spam_zero_shot(self, text: str) -> SpamLLMResult:
         """
         Detects whether the texts are spam or not using Zero Shot Classification with MNLI (joeddav/xlm-roberta-large-xnli)
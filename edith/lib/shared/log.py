@@ -0,0 +1,43 @@
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+def setup_queue_logging(level: int = logging.INFO) -> QueueListener:
+    """
+    Routes root logging through a queue: callers format the record (QueueHandler.prepare)
+    and enqueue it, and a listener thread does the (blocking) stream writes. Safe to call
+    more than once.
+    """
+    global _queue_handler, _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    _queue_handler = QueueHandler(log_queue)
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    _listener.start()
+    return _listener
+
+def stop_queue_logging():
+    """Flushes the pending records and detaches the queue handler from the root logger"""
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    _queue_handler = None
+    _listener = None
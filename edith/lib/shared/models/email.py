@@ -2,13 +2,13 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Dict, Optional
 
-@dataclass
+@dataclass(slots=True)
 class EmailConfig:
     email_address: str
     is_primary: bool = False
     account_type: str = "personal"  # personal, work, school
 
-@dataclass
+@dataclass(slots=True)
 class EmailMessage:
     id: str
     thread_id: Optional[str]
@@ -0,0 +1,53 @@
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+from typing import Dict, List, Optional
+
+# Keys per SELECT ... IN (...) query, below SQLite's default bound-parameter limit
+EMBEDDING_CACHE_LOOKUP_BATCH = 500
+
+class EmbeddingCache:
+    """
+    Persistent sha256(text) -> float32 embedding lookup table in a single SQLite file.
+    Keys also cover the embedding model name, so switching models never returns stale vectors.
+    """
+    def __init__(self, path: str, model_name: Optional[str] = None):
+        self._model_prefix = f"{model_name or 'default'}\0".encode()
+        # Shared by the API's worker threads, so access is serialized with a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def key(self, text: str) -> str:
+        """Cache key of a plaintext document"""
+        return hashlib.sha256(self._model_prefix + text.encode()).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Returns the cached embeddings of the keys that are present"""
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), EMBEDDING_CACHE_LOOKUP_BATCH):
+                batch = keys[i:i + EMBEDDING_CACHE_LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+                found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+        return found
+
+    def put_many(self, keys: List[str], embeddings: np.ndarray):
+        """Stores one float32 embedding row per key (existing keys are overwritten)"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                zip(keys, (row.tobytes() for row in embeddings))
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
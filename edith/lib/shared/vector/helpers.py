@@ -0,0 +1,184 @@
+import logging
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+from chromadb.utils import embedding_functions
+
+logger = logging.getLogger(__name__)
+
+# Documents encoded per forward pass by the sentence-transformers encoder
+EMBEDDING_BATCH_SIZE = 64
+# Longer inputs are truncated to this many tokens before encoding
+EMBEDDING_MAX_SEQ_LENGTH = 256
+# MMR trade-off: 1.0 ranks by relevance only, 0.0 by diversity only
+MMR_LAMBDA = 0.5
+
+class SentenceTransformerEmbedder:
+    """Batched sentence-transformers encoder, called like a Chroma embedding function"""
+    def __init__(self, model_name: str, device: Optional[str] = None):
+        from sentence_transformers import SentenceTransformer
+        
+        # device=None lets sentence-transformers pick CUDA / MPS when available
+        self.model = SentenceTransformer(model_name, device=device)
+        self.model.max_seq_length = EMBEDDING_MAX_SEQ_LENGTH
+    
+    def count_tokens(self, text: str) -> int:
+        """Number of tokens the encoder sees for text (special tokens included, before truncation)"""
+        return len(self.model.tokenizer(text, verbose=False)["input_ids"])
+    
+    def __call__(self, texts: List[str]):
+        return self.model.encode(
+            list(texts),
+            batch_size=EMBEDDING_BATCH_SIZE,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )
+
+def get_embedding_fn(model_name: Optional[str] = None, device: Optional[str] = None):
+    """
+    Returns Chroma's bundled ONNX MiniLM embedding function, or a batched sentence-transformers
+    encoder when a model name is configured and the package is installed.
+    """
+    if model_name:
+        try:
+            return SentenceTransformerEmbedder(model_name, device)
+        except ImportError:
+            logger.warning("sentence-transformers is not installed, falling back to the default embedding function")
+    return embedding_functions.DefaultEmbeddingFunction()
+
+def split_words(text: str, chunk_words: int, overlap_words: int, max_chunks: int,
+                max_chars: Optional[int] = None, count_tokens: Optional[Callable[[str], int]] = None,
+                max_tokens: Optional[int] = None) -> List[str]:
+    """
+    Splits text into windows of up to chunk_words words, each overlapping the previous one by
+    overlap_words, keeping at most max_chunks windows. Empty text yields one empty chunk.
+    Windows are also shrunk to at most max_chars characters and, given a count_tokens callable,
+    max_tokens tokens; whitespace-free runs longer than max_chars (CJK text, long URLs) are cut.
+    """
+    words = text.split()
+    if max_chars:
+        words = [word[i:i + max_chars] for word in words for i in range(0, len(word), max_chars)]
+    
+    chunks = []
+    start = 0
+    while len(chunks) < max_chunks:
+        end = min(start + chunk_words, len(words))
+        if max_chars:
+            # last word that still fits, counting one separating space per word
+            length = -1
+            for stop in range(start, end):
+                length += len(words[stop]) + 1
+                if length > max_chars:
+                    end = max(stop, start + 1)
+                    break
+        if count_tokens and max_tokens:
+            # shrink proportionally to the overshoot until the window fits the token budget
+            while end - start > 1 and (tokens := count_tokens(" ".join(words[start:end]))) > max_tokens:
+                end = start + max(1, min(end - start - 1, (end - start) * max_tokens // tokens))
+        
+        chunks.append(" ".join(words[start:end]))
+        if end >= len(words):
+            break
+        start = max(end - overlap_words, start + 1)
+    return chunks
+
+def quantize_int8(vectors) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-row int8 quantization: returns (int8 rows, float32 per-row scales),
+    with rows ~= vectors * scales. Cosine similarity is unaffected by the per-row scale.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    max_abs = np.abs(vectors).max(axis=1, keepdims=True)
+    scales = np.divide(127.0, max_abs, out=np.zeros_like(max_abs), where=max_abs > 0)
+    return np.rint(vectors * scales).astype(np.int8), scales
+
+def mmr(query_embedding, embeddings, k: int, lambda_mult: float = MMR_LAMBDA) -> List[int]:
+    """
+    Maximal Marginal Relevance: greedily picks up to k rows of embeddings that are similar to the
+    query but dissimilar to the rows already picked. Returns row indices in selection order.
+    """
+    docs = np.asarray(embeddings, dtype=np.float32)
+    if k <= 0 or len(docs) == 0:
+        return []
+    k = min(k, len(docs))
+    
+    docs = docs / (np.linalg.norm(docs, axis=1, keepdims=True) + 1e-12)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / (np.linalg.norm(query) + 1e-12)
+    
+    # Weighted relevance; picked rows are set to -inf so they are never picked again
+    relevance = lambda_mult * (docs @ query)
+    selected = [int(np.argmax(relevance))]
+    relevance[selected[0]] = -np.inf
+    
+    # Highest similarity of every row to the picked set, updated incrementally after each pick
+    max_sim = docs @ docs[selected[0]]
+    scores = np.empty_like(max_sim)
+    
+    while len(selected) < k:
+        np.multiply(max_sim, 1.0 - lambda_mult, out=scores)
+        np.subtract(relevance, scores, out=scores)
+        idx = int(np.argmax(scores))
+        selected.append(idx)
+        relevance[idx] = -np.inf
+        np.maximum(max_sim, docs @ docs[idx], out=max_sim)
+    
+    return selected
+
+def cosine_top_k(matrix, queries, k: int, exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact (brute-force) cosine search: the k rows of matrix most similar to each query, best first.
+    Returns (row indices, similarities), both shaped (len(queries), k). Rows flagged in the
+    exclude mask are never returned, so k is capped at the number of remaining rows.
+    """
+    docs = np.asarray(matrix, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    queries = queries / (np.linalg.norm(queries, axis=1, keepdims=True) + 1e-12)
+    
+    # One matmul scores every query against every row; row norms are divided out afterwards
+    # (einsum computes them several times faster than np.linalg.norm along an axis)
+    sims = (queries @ docs.T) / (np.sqrt(np.einsum('ij,ij->i', docs, docs)) + 1e-12)
+    available = len(docs)
+    if exclude is not None:
+        sims[:, exclude] = -np.inf
+        available -= int(np.count_nonzero(exclude))
+    k = min(k, available)
+    if k <= 0:
+        return np.empty((len(queries), 0), dtype=np.intp), np.empty((len(queries), 0), dtype=np.float32)
+    
+    # Partial selection of the k best per query, then only those k are sorted
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    top_sims = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-top_sims, axis=1)
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_sims, order, axis=1)
+
+def cluster_by_similarity(embeddings, distance_threshold: float) -> List[int]:
+    """
+    Average-linkage agglomerative clustering on cosine distance: clusters keep merging while the
+    closest pair is nearer than distance_threshold. Returns one cluster label per row.
+    """
+    docs = np.asarray(embeddings, dtype=np.float32)
+    n = len(docs)
+    if n == 0:
+        return []
+    
+    docs = docs / (np.linalg.norm(docs, axis=1, keepdims=True) + 1e-12)
+    distances = 1.0 - docs @ docs.T
+    np.fill_diagonal(distances, np.inf)
+    sizes = np.ones(n)
+    labels = np.arange(n)
+    
+    while True:
+        i, j = np.unravel_index(np.argmin(distances), distances.shape)
+        if distances[i, j] >= distance_threshold:
+            break
+        # Lance-Williams update for average linkage: cluster j is merged into cluster i
+        merged = (sizes[i] * distances[i] + sizes[j] * distances[j]) / (sizes[i] + sizes[j])
+        distances[i, :] = merged
+        distances[:, i] = merged
+        distances[i, i] = np.inf
+        distances[j, :] = np.inf
+        distances[:, j] = np.inf
+        sizes[i] += sizes[j]
+        labels[labels == j] = i
+    
+    return labels.tolist()
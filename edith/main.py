@@ -1,4 +1,5 @@
 import os
+import logging
 import shutil
 from dotenv import load_dotenv
 
@@ -13,6 +14,8 @@ from edith.services.email.filter.filter import EmailFilter
 def main():
     # 1. Load Environment
     load_dotenv()
+    # Services log instead of printing; show their messages on the console like the CLI output
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("🤖 Initializing Edith (CLI Mode)...")
 
     config = EmailAssistantConfig()
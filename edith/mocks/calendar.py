@@ -1,3 +1,4 @@
+from operator import itemgetter
 from typing import List, Dict, Any
 from edith.mocks.store import MockDataStore
 
@@ -17,6 +18,6 @@ class DummyCalendarService:
         raw_events = self.store.get_calendar_events()
         
         # Simple string sort works for ISO format
-        raw_events.sort(key=lambda x: x["start"])
+        raw_events.sort(key=itemgetter("start"))
         
         return raw_events
@@ -1,4 +1,4 @@
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Iterator
 from datetime import datetime
 from edith.lib.shared.models.email import EmailMessage
 from edith.config import EmailAssistantConfig
@@ -10,7 +10,7 @@ class DummyEmailFetcher:
         self.store = MockDataStore()
         self.creds = "mock_creds" # Dummy value to pass checks if needed, or None
 
-    def get_emails(self, max_results: int = 50, query: str = "newer_than:30d", page_token: str = None, exclude_noise: bool = True) -> Tuple[List[EmailMessage], Optional[str]]:
+    def get_emails(self, max_results: int = 50, query: str = "newer_than:30d", page_token: str = None, exclude_noise: bool = True, headers_only: bool = False) -> Tuple[List[EmailMessage], Optional[str]]:
         raw_emails = self.store.get_emails()
         
         email_messages = []
@@ -33,6 +33,16 @@ class DummyEmailFetcher:
             
         return email_messages[:max_results], None
 
+    def iter_emails(self, query: str = "newer_than:30d", page_size: int = 50, exclude_noise: bool = True, headers_only: bool = False) -> Iterator[List[EmailMessage]]:
+        # The mock store is a single in-memory page
+        emails, _ = self.get_emails(max_results=page_size)
+        if emails:
+            yield emails
+
+    def hydrate_bodies(self, emails: List[EmailMessage]) -> List[EmailMessage]:
+        # Mock emails always carry their full body
+        return emails
+
     def authenticate(self):
         return True
 
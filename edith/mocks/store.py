@@ -1,5 +1,6 @@
 import json
 import os
+from operator import itemgetter
 from typing import List, Dict, Any, Optional
 
 class MockDataStore:
@@ -37,7 +38,7 @@ class MockDataStore:
                 email["account_email"] = acc_data.get("email")
                 all_emails.append(email)
                 
-        all_emails.sort(key=lambda x: x["date"], reverse=True)
+        all_emails.sort(key=itemgetter("date"), reverse=True)
         return all_emails
 
     def get_calendar_events(self, account_id: Optional[str] = None) -> List[Dict]:
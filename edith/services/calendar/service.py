@@ -1,23 +1,38 @@
+import time
+import logging
+from operator import attrgetter
 from googleapiclient.discovery import build
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from datetime import datetime, timedelta
 
 from edith.lib.shared.models.calendar import CalendarEvent
 from edith.config import EmailAssistantConfig
 
+logger = logging.getLogger(__name__)
+
+# How long fetched primary-calendar events are reused before hitting the Calendar API again
+EVENTS_CACHE_TTL_SECONDS = 60
+# The Calendar API accepts at most 50 calls per batch request
+CALENDAR_BATCH_SIZE = 50
+# Events per events.list page (the API default is 250)
+EVENTS_PAGE_SIZE = 250
+
 class CalendarService:
     def __init__(self, config: EmailAssistantConfig):
         self.config = config
         self.service = None
         self.SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
+        # days_ahead -> (fetched_at, events)
+        self._events_cache: Dict[int, Tuple[float, List[CalendarEvent]]] = {}
         
     def authenticate(self, creds) -> bool:
         """Authenticate with Google Calendar using existing credentials"""
         try:
             self.service = build('calendar', 'v3', credentials=creds)
+            self._events_cache.clear()
             return True
         except Exception as e:
-            print(f"Error authenticating with Calendar: {e}")
+            logger.error("Error authenticating with Calendar: %s", e)
             return False
     
     def get_events(self, days_ahead: int = 30) -> List[CalendarEvent]:
@@ -25,31 +40,17 @@ class CalendarService:
         if not self.service:
             raise Exception("Not authenticated")
         
+        # Every question and sidebar refresh asks for the same window, so reuse a recent fetch
+        cached = self._events_cache.get(days_ahead)
+        if cached and time.monotonic() - cached[0] < EVENTS_CACHE_TTL_SECONDS:
+            return list(cached[1])
+        
         try:
-            # Calculate time range
-            now = datetime.utcnow().isoformat() + 'Z'  # 'Z' indicates UTC time
-            end_time = (datetime.utcnow() + timedelta(days=days_ahead)).isoformat() + 'Z'
-            
-            # Get primary calendar events
-            events_result = self.service.events().list(
-                calendarId='primary',
-                timeMin=now,
-                timeMax=end_time,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
-            
-            calendar_events = []
-            for event in events:
-                calendar_event = self._parse_event(event)
-                if calendar_event:
-                    calendar_events.append(calendar_event)
-            
-            return calendar_events
+            calendar_events = list(self._iter_events('primary', days_ahead))
+            self._events_cache[days_ahead] = (time.monotonic(), calendar_events)
+            return list(calendar_events)
         except Exception as e:
-            print(f"Error fetching calendar events: {e}")
+            logger.error("Error fetching calendar events: %s", e)
             return []
     
     def get_all_calendar_events(self, days_ahead: int = 30) -> List[CalendarEvent]:
@@ -58,54 +59,84 @@ class CalendarService:
             raise Exception("Not authenticated")
         
         all_events = []
+        # Same for every event, so look it up once rather than per parsed event
+        primary_email = self.config.get_primary_email()
+        # calendar_id -> (request, first page) for calendars with more pages to follow
+        continued = {}
+        list_requests = {}
+        
+        def collect(calendar_id, response, exception):
+            if exception:
+                logger.error("Error fetching events from calendar %s: %s", calendar_id, exception)
+                return
+            all_events.extend([
+                calendar_event for event in response.get('items', [])
+                if (calendar_event := self._parse_event(event, calendar_id, primary_email)) is not None
+            ])
+            if response.get('nextPageToken'):
+                continued[calendar_id] = (list_requests[calendar_id], response)
         
         try:
             # Get list of calendars
             calendar_list = self.service.calendarList().list().execute()
             calendars = calendar_list.get('items', [])
-            
-            for calendar in calendars:
-                if calendar['accessRole'] in ['owner', 'writer', 'reader']:
-                    events = self._get_calendar_events(calendar['id'], days_ahead)
-                    all_events.extend(events)
+            calendar_ids = [calendar['id'] for calendar in calendars if calendar['accessRole'] in ['owner', 'writer', 'reader']]
+            
+            # One batch HTTP round trip for all calendars instead of one request per calendar
+            for i in range(0, len(calendar_ids), CALENDAR_BATCH_SIZE):
+                batch = self.service.new_batch_http_request(callback=collect)
+                for calendar_id in calendar_ids[i:i + CALENDAR_BATCH_SIZE]:
+                    list_requests[calendar_id] = self._events_list_request(calendar_id, days_ahead)
+                    batch.add(list_requests[calendar_id], request_id=calendar_id)
+                batch.execute()
+            
+            # Busy calendars that did not fit in the first page are followed up one by one
+            # (a failure there only drops that calendar's remaining pages)
+            for calendar_id, (request, response) in continued.items():
+                try:
+                    next_request = self.service.events().list_next(request, response)
+                    all_events.extend(list(self._iter_events(calendar_id, days_ahead, next_request)))
+                except Exception as e:
+                    logger.error("Error fetching events from calendar %s: %s", calendar_id, e)
             
             # Sort events by start time
-            all_events.sort(key=lambda x: x.start_time)
+            all_events.sort(key=attrgetter('start_time'))
             return all_events
             
         except Exception as e:
-            print(f"Error fetching all calendar events: {e}")
+            logger.error("Error fetching all calendar events: %s", e)
             return []
     
-    def _get_calendar_events(self, calendar_id: str, days_ahead: int) -> List[CalendarEvent]:
-        """Get events from a specific calendar"""
-        try:
-            now = datetime.utcnow().isoformat() + 'Z'
-            end_time = (datetime.utcnow() + timedelta(days=days_ahead)).isoformat() + 'Z'
-            
-            events_result = self.service.events().list(
-                calendarId=calendar_id,
-                timeMin=now,
-                timeMax=end_time,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
-            calendar_events = []
-            
-            for event in events:
-                calendar_event = self._parse_event(event, calendar_id)
-                if calendar_event:
-                    calendar_events.append(calendar_event)
-            
-            return calendar_events
-            
-        except Exception as e:
-            print(f"Error fetching events from calendar {calendar_id}: {e}")
-            return []
+    def _iter_events(self, calendar_id: str, days_ahead: int, request=None) -> Iterator[CalendarEvent]:
+        """Yields parsed events page by page, starting from request (or the first page)"""
+        if request is None:
+            request = self._events_list_request(calendar_id, days_ahead)
+        primary_email = self.config.get_primary_email()
+        
+        while request is not None:
+            response = request.execute()
+            # Parse the whole page in one comprehension, then hand it on
+            yield from [
+                calendar_event for event in response.get('items', [])
+                if (calendar_event := self._parse_event(event, calendar_id, primary_email)) is not None
+            ]
+            request = self.service.events().list_next(request, response)
+    
+    def _events_list_request(self, calendar_id: str, days_ahead: int):
+        """events.list request for the next days_ahead days of a calendar"""
+        now = datetime.utcnow().isoformat() + 'Z'
+        end_time = (datetime.utcnow() + timedelta(days=days_ahead)).isoformat() + 'Z'
+        
+        return self.service.events().list(
+            calendarId=calendar_id,
+            timeMin=now,
+            timeMax=end_time,
+            maxResults=EVENTS_PAGE_SIZE,
+            singleEvents=True,
+            orderBy='startTime'
+        )
     
-    def _parse_event(self, event: Dict[str, Any], calendar_id: str = 'primary') -> Optional[CalendarEvent]:
+    def _parse_event(self, event: Dict[str, Any], calendar_id: str, primary_email: Optional[str]) -> Optional[CalendarEvent]:
         """Parse a calendar event from Google Calendar API response"""
         try:
             title = event.get('summary', 'No Title')
@@ -116,9 +147,9 @@ class CalendarService:
             end = event.get('end', {})
             
             if 'dateTime' in start:
-                # This is a timed event
-                start_time = datetime.fromisoformat(start['dateTime'].replace('Z', '+00:00'))
-                end_time = datetime.fromisoformat(end['dateTime'].replace('Z', '+00:00'))
+                # This is a timed event; fromisoformat parses the trailing 'Z' natively (3.11+)
+                start_time = datetime.fromisoformat(start['dateTime'])
+                end_time = datetime.fromisoformat(end['dateTime'])
             else:
                 # This is an all-day event
                 start_time = datetime.fromisoformat(start['date'])
@@ -126,7 +157,6 @@ class CalendarService:
                 # Add one day to end_time for all-day events
                 end_time = end_time + timedelta(days=1)
             
-            primary_email = self.config.get_primary_email()
             if primary_email is None:
                 return None
                 
@@ -140,7 +170,7 @@ class CalendarService:
                 calendar_type=calendar_id
             )
         except Exception as e:
-            print(f"Error parsing event: {e}")
+            logger.error("Error parsing event: %s", e)
             return None
     
     def create_unified_event(self, calendar_event: CalendarEvent) -> bool:
@@ -167,7 +197,9 @@ class CalendarService:
                 body=event_body
             ).execute()
             
+            # The new event must show up on the next read
+            self._events_cache.clear()
             return True
         except Exception as e:
-            print(f"Error creating unified event: {e}")
+            logger.error("Error creating unified event: %s", e)
             return False
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Iterator
 from edith.config import EmailAssistantConfig
 from edith.lib.shared.models.email import EmailMessage
 from edith.services.email.providers.gmail import GmailService
@@ -16,8 +16,14 @@ class EmailFetcher:
     def get_profile_email(self) -> str:
         return self.gmail_provider.get_profile_email()
         
-    def get_emails(self, max_results: int = 50, query: str = "newer_than:30d", page_token: str = None, exclude_noise: bool = True) -> Tuple[List[EmailMessage], Optional[str]]:
-        return self.gmail_provider.get_emails(max_results, query, page_token, exclude_noise)
+    def get_emails(self, max_results: int = 50, query: str = "newer_than:30d", page_token: str = None, exclude_noise: bool = True, headers_only: bool = False) -> Tuple[List[EmailMessage], Optional[str]]:
+        return self.gmail_provider.get_emails(max_results, query, page_token, exclude_noise, headers_only)
+    
+    def iter_emails(self, query: str = "newer_than:30d", page_size: int = 50, exclude_noise: bool = True, headers_only: bool = False) -> Iterator[List[EmailMessage]]:
+        return self.gmail_provider.iter_emails(query, page_size, exclude_noise, headers_only)
+    
+    def hydrate_bodies(self, emails: List[EmailMessage]) -> List[EmailMessage]:
+        return self.gmail_provider.hydrate_bodies(emails)
     
     @property
     def creds(self):
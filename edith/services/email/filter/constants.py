@@ -14,4 +14,11 @@ IMPORTANT_SUBJECTS = [
 'project', 'schedule', 'appointment', 'interview', 'receipt', 'invoice'
 ]
 
+# Literal tokens that every action pattern in EmailFilter._contains_important_content requires.
+# If none of them appear in the body, none of the regexes can match.
+ACTION_KEYWORDS = (
+'please', 'need', 'required', 'must', 'should', 'deadline', 'due',
+'meeting', 'call', 'appointment', 'attach', 'document', 'file'
+)
+
 LIST_HEADER_KEYS = {"list-unsubscribe", "list-id", "precedence"}
\ No newline at end of file
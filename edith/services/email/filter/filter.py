@@ -1,8 +1,8 @@
 import re, logging
-from typing import List
+from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
 
-from edith.services.email.filter.constants import SPAM_KEYWORDS, IMPORTANT_SENDERS, IMPORTANT_SUBJECTS, LIST_HEADER_KEYS, ZERO_SHOT_SPAM_LABELS
+from edith.services.email.filter.constants import SPAM_KEYWORDS, IMPORTANT_SENDERS, IMPORTANT_SUBJECTS, LIST_HEADER_KEYS, ZERO_SHOT_SPAM_LABELS, ACTION_KEYWORDS
 
 from edith.lib.shared.models.email import EmailMessage
 from edith.config import EmailAssistantConfig
@@ -10,32 +10,85 @@ from edith.lib.shared.llm.spam_service import SpamLLMService
 
 logger = logging.getLogger(__name__)
 
+# Marketing footers checked in the body (Universal fallback for non-Gmail)
+BODY_FOOTER_KEYWORDS = ('unsubscribe', 'view in browser', 'update preferences')
+
+# Look for action items or important content
+ACTION_PATTERNS = (
+    r'\bplease\b.*\b(action|review|respond|call|meet)\b',
+    r'\b(need|required|must|should)\b',
+    r'\b(deadline|due|meeting|call|appointment)\b',
+    r'\b(attachment|attached|document|file)\b'
+)
+# Bodies shorter than the shortest action keyword cannot match any action pattern
+MIN_ACTION_BODY_LENGTH = min(map(len, ACTION_KEYWORDS))
+
 class EmailFilter:
-    def __init__(self, config: EmailAssistantConfig):
-        self.spam_service = SpamLLMService(config)
+    def __init__(self, config: EmailAssistantConfig, spam_service: Optional[SpamLLMService] = None):
+        # Reuse an already loaded model when one is shared (e.g. app.state.spam_service)
+        self.spam_service = spam_service or SpamLLMService(config)
+        
+        # Each keyword list is merged into one precompiled alternation, so a check is a single
+        # regex scan instead of one substring scan per keyword (fields are lowercased before matching)
+        self._spam_re = self._compile_keywords(SPAM_KEYWORDS)
+        self._sender_re = self._compile_keywords(IMPORTANT_SENDERS)
+        self._subject_re = self._compile_keywords(IMPORTANT_SUBJECTS)
+        self._footer_re = self._compile_keywords(BODY_FOOTER_KEYWORDS)
+        self._action_re = re.compile("|".join(f"(?:{pattern})" for pattern in ACTION_PATTERNS))
         
     def filter_relevant_emails(self, emails: List[EmailMessage]) -> List[EmailMessage]:
         """Filter relevant emails by sequential filtering using Heuristics and LLM Detection"""
         relevant_emails_idx = []
         relevant_ham_emails = []
         
+        # compute the recency cutoff once per batch instead of once per email
+        cutoffs = self._recency_cutoffs()
+        
         # filter by heuristics scoring first
         for i, email in enumerate(emails):
-            if self._is_relevant(email):
+            if self._is_relevant(email, cutoffs):
                 relevant_emails_idx.append(i)
                 
-        # then, filter again the emails that pass heuristics through LLM detection
-        for idx in relevant_emails_idx:
-            if not self._is_spam_ml(emails[idx]):
-                emails[idx].is_relevant = True
-                relevant_ham_emails.append(emails[idx])
+        # then, filter again the emails that pass heuristics through LLM detection (one batched call)
+        candidates = [emails[idx] for idx in relevant_emails_idx]
+        for email, is_spam in zip(candidates, self._is_spam_ml_batch(candidates)):
+            if not is_spam:
+                email.is_relevant = True
+                relevant_ham_emails.append(email)
         
         return relevant_ham_emails
     
     
-    def _is_relevant(self, email: EmailMessage) -> bool:
+    def filter_hydrated_emails(self, emails: List[EmailMessage]) -> List[EmailMessage]:
+        """
+        Second pass for emails screened by filter_relevant_emails on headers + snippet only: once
+        their full bodies are downloaded, re-runs the body-dependent checks (marketing footer,
+        then LLM Detection on the full text)
+        """
+        candidates = []
+        for email in emails:
+            if self._is_important_sender((email.sender or "").lower()) or not self._has_marketing_footer((email.body or "").lower()):
+                candidates.append(email)
+            else:
+                email.is_relevant = False
+        
+        relevant_ham_emails = []
+        for email, is_spam in zip(candidates, self._is_spam_ml_batch(candidates)):
+            if is_spam:
+                email.is_relevant = False
+            else:
+                relevant_ham_emails.append(email)
+        
+        return relevant_ham_emails
+    
+    def _is_relevant(self, email: EmailMessage, cutoffs: Optional[Tuple[datetime, datetime]] = None) -> bool:
+        # Lowercase each field once; every check below works on these copies
+        # (the body, by far the largest, only once the cheap header checks are done)
+        sender = (email.sender or "").lower()
+        subject = (email.subject or "").lower()
+        
         # 1. Immediate Qualifiers: Always keep emails from important senders
-        if self._is_important_sender(email.sender):
+        if self._is_important_sender(sender):
             return True
         
         # 2. Immediate Disqualifiers: Filter out known noise
@@ -47,75 +100,102 @@ class EmailFilter:
                 return False
         
         # B. Generic Spam/Marketing Detection (Crucial for non-Gmail providers)
-        if self._is_spam(email):
+        if self._is_spam_header(subject, sender):
             return False
         
         # C. Mailing List (No need to notice advertisement emails)
         if self._is_mailing_list(email.headers):
             return False
+        
+        # D. Marketing footers in the body
+        body = email.body.lower() if email.body else ""
+        if body and self._has_marketing_footer(body):
+            return False
 
         # 3. Content Qualifiers: If it's not spam, is it important?
         
-        if self._contains_important_keywords(email.subject):
+        if subject.startswith('re:'):
             return True
         
-        if email.subject.lower().startswith('re:'):
+        if self._contains_important_keywords(subject):
             return True
         
-        if self._contains_important_content(email.body):
+        if self._contains_important_content(body):
             return True
         
         # 4. Fallback: If it passed spam checks and is recent, keep it.
-        if self._is_recent_email(email.date):
+        if self._is_recent_email(email.date, cutoffs or self._recency_cutoffs()):
             return True
         
         return False
     
     def _is_important_sender(self, sender: str) -> bool:
-        return self._contains_any_keyword(sender, IMPORTANT_SENDERS)
+        return self._matches(self._sender_re, sender)
     
     def _contains_important_keywords(self, subject: str) -> bool:
-        return self._contains_any_keyword(subject, IMPORTANT_SUBJECTS)
+        return self._matches(self._subject_re, subject)
     
-    def _is_recent_email(self, date: datetime) -> bool:
-        now = datetime.now()
-        if date.tzinfo:
-            now = now.astimezone()
-        thirty_days_ago = now - timedelta(days=30)
-        return date > thirty_days_ago
+    def _recency_cutoffs(self) -> Tuple[datetime, datetime]:
+        """Returns the (naive, aware) datetimes an email must be newer than to count as recent"""
+        thirty_days_ago = datetime.now() - timedelta(days=30)
+        return thirty_days_ago, thirty_days_ago.astimezone()
     
-    def _is_spam(self, email: EmailMessage) -> bool:
+    def _is_recent_email(self, date: datetime, cutoffs: Tuple[datetime, datetime]) -> bool:
+        naive_cutoff, aware_cutoff = cutoffs
+        return date > (aware_cutoff if date.tzinfo else naive_cutoff)
+    
+    def _is_spam_header(self, subject: str, sender: str) -> bool:
+        """Expects lowercased subject and sender"""
         # Check subject for spam keywords
-        if self._contains_any_keyword(email.subject, SPAM_KEYWORDS):
+        if self._matches(self._spam_re, subject):
             return True
         
         # Check sender for spam patterns
         # Removed 'noreply' as it is often used for receipts/tickets
-        if self._contains_any_keyword(email.sender, {"marketing"}):
+        if "marketing" in sender:
             return True
         
         # Check if email has many recipients (likely marketing)
         # This would require additional parsing of headers
         
-        # Check body for common marketing footers (Universal fallback for non-Gmail)
-        if self._contains_any_keyword(email.body, {'unsubscribe', 'view in browser', 'update preferences'}):
-            return True
-        
         return False
+    
+    def _has_marketing_footer(self, body: str) -> bool:
+        """Expects a lowercased body"""
+        # Check body for common marketing footers (Universal fallback for non-Gmail)
+        return self._matches(self._footer_re, body)
 
     def _is_spam_ml(self, email: EmailMessage) -> bool:
         """Uses DistillBERT to classify emails as spam or not"""
+        return self._is_spam_ml_batch([email])[0]
+
+    def _is_spam_ml_batch(self, emails: List[EmailMessage]) -> List[bool]:
+        """Batched version of _is_spam_ml: classifies all emails in a single detect_spam call"""
+        if not emails:
+            return []
+        texts = [self._spam_ml_input(email) for email in emails]
         try:
+            ml_results = self.spam_service.detect_spam(texts)
             
-            ml_results = self.spam_service.detect_spam([f'Subject: {email.subject}\n\n{email.body[:512]}'])
+            assert len(ml_results) == len(emails)
             
-            assert len(ml_results) > 0
-            
-            return ml_results[0].label == "Spam"
+            return [result.label == "Spam" for result in ml_results]
         except Exception as e:
-            logging.error(f"Error classifying email: {e}")
-        
-        return False
+            logging.error(f"Error classifying emails: {e}")
+        
+        # one bad input must not let the whole batch through: retry item by item
+        is_spam = []
+        for text in texts:
+            try:
+                is_spam.append(self.spam_service.detect_spam([text])[0].label == "Spam")
+            except Exception as e:
+                logging.error(f"Error classifying email: {e}")
+                is_spam.append(False)
+        return is_spam
+
+    def _spam_ml_input(self, email: EmailMessage) -> str:
+        """Model input of an email, tolerant of missing subjects/bodies"""
+        return f'Subject: {email.subject or ""}\n\n{(email.body or "")[:512]}'
 
     def _is_spam_ml_zero_shot(self, email: EmailMessage) -> bool:
         """Uses Zero Shot Classification with MNNLI to classify emails as spam or not"""
@@ -131,21 +211,17 @@ class EmailFilter:
         return False
 
     def _contains_important_content(self, body: str) -> bool:
-        body_lower = body.lower()
-        
-        # Look for action items or important content
-        action_patterns = [
-            r'\bplease\b.*\b(action|review|respond|call|meet)\b',
-            r'\b(need|required|must|should)\b',
-            r'\b(deadline|due|meeting|call|appointment)\b',
-            r'\b(attachment|attached|document|file)\b'
-        ]
+        """Expects a lowercased body"""
+        # Empty bodies (headers-only fetches, blank replies) need no scan at all
+        if len(body) < MIN_ACTION_BODY_LENGTH:
+            return False
         
-        for pattern in action_patterns:
-            if re.search(pattern, body_lower):
-                return True
+        # Cheap literal prefilter: skip the regex scans when no action keyword is present
+        if not any(keyword in body for keyword in ACTION_KEYWORDS):
+            return False
         
-        return False
+        # All action patterns in a single scan
+        return self._action_re.search(body) is not None
     
     def _is_mailing_list(self, headers: dict) -> bool:
         """Is email part of mailing list"""
@@ -156,15 +232,24 @@ class EmailFilter:
         return (prec or "").lower() in {"bulk", "list", "junk"}
     
     def add_important_sender(self, sender: str):
+        sender = sender.lower()
         if sender not in IMPORTANT_SENDERS:
             IMPORTANT_SENDERS.append(sender)
+            self._sender_re = self._compile_keywords(IMPORTANT_SENDERS)
     
     def add_important_subject_keyword(self, keyword: str):
+        keyword = keyword.lower()
         if keyword not in IMPORTANT_SUBJECTS:
             IMPORTANT_SUBJECTS.append(keyword)
+            self._subject_re = self._compile_keywords(IMPORTANT_SUBJECTS)
             
     # --- Helper Functions ---
     
-    def _contains_any_keyword(self, text: str, keywords: set[str]) -> bool:
-        t = (text or "").lower()
-        return any(k.lower() in t for k in keywords)
\ No newline at end of file
+    def _compile_keywords(self, keywords) -> Optional[re.Pattern]:
+        """Literal alternation of the (lowercased) keywords; None for an empty list, which would match everything"""
+        if not keywords:
+            return None
+        return re.compile("|".join(map(re.escape, keywords)))
+    
+    def _matches(self, pattern: Optional[re.Pattern], text: str) -> bool:
+        return pattern is not None and pattern.search(text) is not None
\ No newline at end of file
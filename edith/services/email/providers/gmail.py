@@ -1,13 +1,21 @@
 import os
+import html
+import logging
+import multiprocessing
+import threading
+import httplib2
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+from datetime import datetime, timezone
 import base64
 from email.utils import parsedate_to_datetime
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
 from google.oauth2.credentials import Credentials
 import wsgiref.simple_server
 from email.utils import getaddresses
@@ -15,6 +23,81 @@ from email.utils import getaddresses
 from edith.lib.shared.models.email import EmailMessage
 from edith.config import EmailAssistantConfig
 
+logger = logging.getLogger(__name__)
+
+# Gmail allows up to 100 calls per batch, but large batches trip per-user rate limits (429)
+BATCH_SIZE = 15
+# Retries (with exponential backoff) for calls that fail inside a batch
+MAX_RETRIES = 3
+# Concurrent GET calls used for those retries (kept small to stay under the rate limit)
+MAX_FETCH_WORKERS = 5
+# Headers requested by headers_only fetches: everything _parse_email and EmailFilter look at
+METADATA_HEADERS = ['Subject', 'From', 'Date', 'To', 'Cc', 'List-Unsubscribe', 'List-Id', 'Precedence']
+METADATA_FIELDS = 'id,threadId,snippet,labelIds,internalDate,payload/headers'
+# Above this much HTML in one fetch, bodies are extracted in worker processes instead of inline
+# (lexbor parses ~50 MB/s, so below a few MB the pickling round-trip costs more than it saves)
+PARALLEL_HTML_BYTES = 4 * 1024 * 1024
+
+# Body extraction lives at module level so worker processes can run (unpickle) it
+def _get_email_body(payload: Dict[str, Any]) -> str:
+    if 'parts' in payload:
+        # Multipart email: prefer the text/plain parts and only decode/parse HTML when there are none
+        parts = payload['parts']
+        plain_parts = [part for part in parts if part.get('mimeType') == 'text/plain']
+        if plain_parts:
+            return "".join(_decode_body_data(part) for part in plain_parts).strip()
+        for part in parts:
+            if part.get('mimeType') == 'text/html':
+                return _html_to_text(_decode_body_data(part)).strip()
+        return ""
+    else:
+        # Single part email
+        content = _decode_body_data(payload)
+        if payload.get('mimeType') == 'text/html':
+            return _html_to_text(content)
+        return content
+
+def _try_get_email_body(payload: Dict[str, Any]) -> Optional[str]:
+    """Worker entry point: None lets the caller redo (and report) a failed extraction inline"""
+    try:
+        return _get_email_body(payload)
+    except Exception:
+        return None
+
+def _decode_body_data(part: Dict[str, Any]) -> str:
+    """Decodes a part's base64url body (attachments carry no inline data and decode to '')"""
+    data = part.get('body', {}).get('data', '')
+    # Gmail strips the padding; the decoder ignores any excess, so a fixed '==' always suffices
+    return base64.urlsafe_b64decode(data.encode('ascii') + b'==').decode('utf-8', errors='replace')
+
+def _html_to_text(html_content: str) -> str:
+    """Extracts the readable text of an HTML body using selectolax's lexbor (C) parser"""
+    tree = LexborHTMLParser(html_content)
+    tree.strip_tags(['script', 'style'])
+    # HTML fragments without a <body> still parse, fall back to the document root
+    node = tree.body or tree.root
+    return node.text(separator=' ', strip=True) if node else ""
+
+def _html_size(payload: Dict[str, Any]) -> int:
+    """Decoded size of the HTML parts Gmail reports for a message"""
+    parts = payload.get('parts', [payload])
+    return sum(part.get('body', {}).get('size', 0) for part in parts if part.get('mimeType') == 'text/html')
+
+_body_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_body_pool() -> ProcessPoolExecutor:
+    """Lazily started, shared pool; spawn (not fork) since the app runs other threads"""
+    global _body_pool
+    if _body_pool is None:
+        _body_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+    return _body_pool
+
+def _shutdown_body_pool():
+    global _body_pool
+    if _body_pool is not None:
+        _body_pool.shutdown(wait=False, cancel_futures=True)
+        _body_pool = None
+
 class GmailService:
     def __init__(self, config: EmailAssistantConfig):
         self.config = config
@@ -33,7 +116,7 @@ class GmailService:
             try:
                 creds = Credentials.from_authorized_user_file(token_filename, self.SCOPES)
             except Exception as e:
-                print(f"Error loading token (will re-authenticate): {e}")
+                logger.warning("Error loading token (will re-authenticate): %s", e)
                 creds = None
                 
         if not creds or not creds.valid:
@@ -105,7 +188,12 @@ class GmailService:
         flow.fetch_token(code=auth_code)
         return flow.credentials
 
-    def get_emails(self, max_results: int = 50, query: str = "newer_than:30d", page_token: str = None, exclude_noise: bool = True) -> Tuple[List[EmailMessage], Optional[str]]:
+    def get_emails(self, max_results: int = 50, query: str = "newer_than:30d", page_token: str = None, exclude_noise: bool = True, headers_only: bool = False) -> Tuple[List[EmailMessage], Optional[str]]:
+        """
+        Fetches a page of emails. With headers_only=True only the screening headers and the
+        snippet are downloaded (the snippet stands in for the body); call hydrate_bodies on the
+        emails that survive filtering to download their full bodies.
+        """
         if not self.service:
             raise Exception("Not authenticated")
             
@@ -114,49 +202,150 @@ class GmailService:
                 # Filter out noise (Promotions, Social, Spam) at the provider level
                 query = f"{query} -category:promotions -category:social -in:spam -in:trash"
 
-            print(f"   [Gmail] Fetching list of {max_results} messages...")
+            logger.info("[Gmail] Fetching list of %d messages...", max_results)
             result = self.service.users().messages().list(
                 userId='me', maxResults=max_results, q=query, pageToken=page_token).execute()
             messages = result.get('messages', [])
-            print(f"   [Gmail] Found {len(messages)} messages. Downloading details...")
-            
-            email_messages = []
+            logger.info("[Gmail] Found %d messages. Downloading details...", len(messages))
             
             if not messages:
                 return [], result.get('nextPageToken')
 
-            # Use BatchHttpRequest to fetch details in parallel
-            def callback(request_id, response, exception):
-                if exception:
-                    print(f"Error fetching email details: {exception}")
-                else:
-                    email_data = self._parse_email(response)
-                    if email_data:
-                        email_messages.append(email_data)
-
-            # Process in chunks to avoid Rate Limit (429)
-            BATCH_SIZE = 15
-            for i in range(0, len(messages), BATCH_SIZE):
-                batch = self.service.new_batch_http_request(callback=callback)
-                chunk = messages[i:i + BATCH_SIZE]
-                
-                for message in chunk:
-                    batch.add(self.service.users().messages().get(userId='me', id=message['id'], format='full'))
-                    
-                batch.execute()
-            print(f"   [Gmail] Successfully parsed {len(email_messages)} emails.")
+            responses = self._fetch_messages([message['id'] for message in messages], headers_only)
+            email_messages = self._parse_emails(responses)
+            logger.info("[Gmail] Successfully parsed %d emails.", len(email_messages))
             
             return email_messages, result.get('nextPageToken')
         except HttpError as e:
             if e.resp.status == 403 and 'accessNotConfigured' in str(e):
-                print(f"\n❌ CRITICAL: Gmail API is not enabled for this project.")
-                print(f"   Please enable it in the Google Cloud Console (see URL in error details below).")
-            print(f"Error fetching emails: {e}")
+                logger.error("❌ CRITICAL: Gmail API is not enabled for this project. "
+                             "Please enable it in the Google Cloud Console (see URL in error details below).")
+            logger.error("Error fetching emails: %s", e)
             return [], None
         except Exception as e:
-            print(f"Error fetching emails: {e}")
+            logger.error("Error fetching emails: %s", e)
             return [], None
     
+    def iter_emails(self, query: str = "newer_than:30d", page_size: int = 50, exclude_noise: bool = True, headers_only: bool = False) -> Iterator[List[EmailMessage]]:
+        """
+        Streams emails in batches of up to BATCH_SIZE as soon as each batch is downloaded, walking
+        every result page. The next page's list call runs in the background while the current page
+        is downloaded, so callers can filter/index early batches while later ones are in flight.
+        Stop iterating to stop fetching.
+        """
+        if not self.service:
+            raise Exception("Not authenticated")
+        
+        if exclude_noise:
+            # Filter out noise (Promotions, Social, Spam) at the provider level
+            query = f"{query} -category:promotions -category:social -in:spam -in:trash"
+        
+        # Separate connection for the background list calls (httplib2.Http is not thread-safe)
+        list_http = AuthorizedHttp(self.creds, http=httplib2.Http())
+        
+        def list_page(page_token: Optional[str]) -> Dict[str, Any]:
+            return self.service.users().messages().list(
+                userId='me', maxResults=page_size, q=query, pageToken=page_token).execute(http=list_http, num_retries=MAX_RETRIES)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                result = list_page(None)
+                while True:
+                    messages = result.get('messages', [])
+                    next_token = result.get('nextPageToken')
+                    # prefetch the next page listing while this page's messages download
+                    next_page = executor.submit(list_page, next_token) if next_token else None
+                    
+                    message_ids = [message['id'] for message in messages]
+                    for i in range(0, len(message_ids), BATCH_SIZE):
+                        responses = self._fetch_messages(message_ids[i:i + BATCH_SIZE], headers_only)
+                        email_messages = self._parse_emails(responses)
+                        if email_messages:
+                            yield email_messages
+                    
+                    if not next_page:
+                        break
+                    result = next_page.result()
+        except HttpError as e:
+            logger.error("Error fetching emails: %s", e)
+    
+    def hydrate_bodies(self, emails: List[EmailMessage]) -> List[EmailMessage]:
+        """Replaces the snippet placeholder of emails fetched with headers_only=True by the full body"""
+        if not self.service:
+            raise Exception("Not authenticated")
+        if not emails:
+            return emails
+
+        responses = self._fetch_messages([email.id for email in emails])
+        extracted = self._extract_bodies(responses)
+        bodies = {
+            msg['id']: body if body is not None else _get_email_body(msg.get('payload', {}))
+            for msg, body in zip(responses, extracted)
+        }
+        for email in emails:
+            if email.id in bodies:
+                email.body = bodies[email.id]
+        return emails
+
+    def _fetch_messages(self, message_ids: List[str], headers_only: bool = False) -> List[Dict[str, Any]]:
+        """Fetches full message resources via batch HTTP requests, preserving the order of message_ids"""
+        responses: Dict[str, Dict[str, Any]] = {}
+        failed: List[str] = []
+
+        # Responses are keyed by request id (= message id) since callbacks fire in arbitrary order
+        def callback(request_id, response, exception):
+            if exception:
+                logger.warning("Error fetching email details: %s", exception)
+                failed.append(request_id)
+            else:
+                responses[request_id] = response
+
+        for i in range(0, len(message_ids), BATCH_SIZE):
+            chunk = message_ids[i:i + BATCH_SIZE]
+            batch = self.service.new_batch_http_request(callback=callback)
+            for message_id in chunk:
+                batch.add(self._get_message_request(message_id, headers_only), request_id=message_id)
+            try:
+                batch.execute()
+            except HttpError as e:
+                logger.warning("Error executing batch request: %s", e)
+                failed.extend(mid for mid in chunk if mid not in responses and mid not in failed)
+
+        # Retry calls that failed inside the batch (e.g. 429/5xx) individually with backoff
+        if failed:
+            responses.update(self._fetch_messages_concurrently(failed, headers_only))
+
+        return [responses[mid] for mid in message_ids if mid in responses]
+
+    def _fetch_messages_concurrently(self, message_ids: List[str], headers_only: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Fetches messages with individual GET calls spread over a bounded thread pool"""
+        thread_local = threading.local()
+
+        def fetch(message_id: str) -> Dict[str, Any]:
+            # httplib2.Http is not thread-safe, so each worker gets its own authorized connection
+            if not hasattr(thread_local, 'http'):
+                thread_local.http = AuthorizedHttp(self.creds, http=httplib2.Http())
+            return self._get_message_request(message_id, headers_only).execute(http=thread_local.http, num_retries=MAX_RETRIES)
+
+        responses: Dict[str, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(message_ids))) as executor:
+            futures = {executor.submit(fetch, message_id): message_id for message_id in message_ids}
+            for future in as_completed(futures):
+                message_id = futures[future]
+                try:
+                    responses[message_id] = future.result()
+                except HttpError as e:
+                    logger.error("Error fetching email %s: %s", message_id, e)
+        return responses
+
+    def _get_message_request(self, message_id: str, headers_only: bool = False):
+        messages = self.service.users().messages()
+        if headers_only:
+            # Skip the MIME tree and base64 bodies; only what the filter needs to screen the email
+            return messages.get(userId='me', id=message_id, format='metadata',
+                                metadataHeaders=METADATA_HEADERS, fields=METADATA_FIELDS)
+        return messages.get(userId='me', id=message_id, format='full')
+
     def get_profile_email(self) -> str:
         if not self.service:
             raise Exception("Not authenticated")
@@ -164,32 +353,50 @@ class GmailService:
             profile = self.service.users().getProfile(userId='me').execute()
             return profile['emailAddress']
         except Exception as e:
-            print(f"Error fetching profile: {e}")
+            logger.error("Error fetching profile: %s", e)
             return "unknown@gmail.com"
     
-    def _parse_email(self, msg: Dict[str, Any]) -> Optional[EmailMessage]:
+    def _parse_emails(self, responses: List[Dict[str, Any]]) -> List[EmailMessage]:
+        bodies = self._extract_bodies(responses)
+        return [email for email in map(self._parse_email, responses, bodies) if email]
+    
+    def _extract_bodies(self, responses: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Extracts the bodies in worker processes when the batch carries a lot of HTML (parsing is
+        CPU-bound); otherwise returns None for each message so they are extracted inline, which is
+        cheaper than pickling small payloads to another process
+        """
+        payloads = [msg.get('payload', {}) for msg in responses]
+        workers = os.cpu_count() or 1
+        if workers < 2 or sum(map(_html_size, payloads)) <= PARALLEL_HTML_BYTES:
+            return [None] * len(payloads)
+        try:
+            chunksize = max(1, len(payloads) // (workers * 4))
+            return list(_get_body_pool().map(_try_get_email_body, payloads, chunksize=chunksize))
+        except BrokenProcessPool as e:
+            logger.warning("Body extraction pool failed, extracting inline: %s", e)
+            _shutdown_body_pool()
+            return [None] * len(payloads)
+    
+    def _parse_email(self, msg: Dict[str, Any], body: Optional[str] = None) -> Optional[EmailMessage]:
         try:
             headers = msg['payload']['headers']
-            subject = ""
-            sender = ""
-            date_str = ""
-            cc_emails = []
-            to_emails = []
-            
-            for header in headers:
-                if header['name'].lower() == 'subject':
-                    subject = header['value']
-                elif header['name'].lower() == 'from':
-                    sender = header['value']
-                elif header['name'].lower() == 'date':
-                    date_str = header['value']
-                elif header['name'].lower() == 'cc':
-                    cc_emails = [email for _, email in getaddresses([header['value']])]
-                elif header['name'].lower() == 'to':
-                    to_emails = [email for _, email in getaddresses([header['value']])]
+            headers_dict, hdrs = self._extract_headers(headers)
+            subject = hdrs.get('subject', '')
+            sender = hdrs.get('from', '')
+            date_str = hdrs.get('date', '')
+            cc_emails = [email for _, email in getaddresses([hdrs['cc']])] if 'cc' in hdrs else []
+            to_emails = [email for _, email in getaddresses([hdrs['to']])] if 'to' in hdrs else []
             
             # Extract email body
-            body = self._get_email_body(msg.get('payload', {}))
+            payload = msg.get('payload', {})
+            # (unless _extract_bodies already did it in a worker process)
+            if body is None:
+                if 'body' in payload or 'parts' in payload:
+                    body = _get_email_body(payload)
+                else:
+                    # Metadata-only fetch: the (HTML-escaped) snippet stands in until hydrate_bodies runs
+                    body = html.unescape(msg.get('snippet', ''))
             
             # Get email thread ID (if exists)
             thread_id = msg.get("threadId", "")
@@ -197,14 +404,16 @@ class GmailService:
             # Check if email is unread
             is_unread = self._is_unread(msg.get("labelIds", []))
             
-            # Parse date
-            try:
-                date = parsedate_to_datetime(date_str)
-            except Exception:
-                # Fallback if date parsing fails
-                date = datetime.now()
-            
-            headers_dict = {h['name']: h['value'] for h in headers}
+            # Parse date: Gmail's internalDate (epoch ms, UTC) avoids parsing the RFC 2822 Date header
+            internal_date = msg.get('internalDate')
+            if internal_date:
+                date = datetime.fromtimestamp(int(internal_date) / 1000, tz=timezone.utc)
+            else:
+                try:
+                    date = parsedate_to_datetime(date_str)
+                except Exception:
+                    # Fallback if date parsing fails
+                    date = datetime.now()
             
             return EmailMessage(
                 id=msg['id'],
@@ -221,37 +430,21 @@ class GmailService:
                 is_unread=is_unread
             )
         except Exception as e:
-            print(f"Error parsing email: {e}")
+            logger.error("Error parsing email: %s", e)
             return None
     
+    def _extract_headers(self, headers: List[Dict[str, str]]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        Builds the headers in one pass: as sent (kept on EmailMessage) and keyed by
+        lowercased name (for lookups, header names are case-insensitive)
+        """
+        headers_dict = {}
+        hdrs = {}
+        for header in headers:
+            name, value = header['name'], header['value']
+            headers_dict[name] = value
+            hdrs[name.lower()] = value
+        return headers_dict, hdrs
+    
     def _is_unread(self, label_ids: List[str]) -> bool:
         return "UNREAD" in label_ids
-    
-    def _get_email_body(self, payload: Dict[str, Any]) -> str:
-        if 'parts' in payload:
-            # Multipart email
-            body = ""
-            for part in payload['parts']:
-                if part['mimeType'] == 'text/plain':
-                    data = part['body']['data']
-                    # Fix padding for base64 decoding
-                    data += '=' * (-len(data) % 4)
-                    body += base64.urlsafe_b64decode(data).decode('utf-8', errors='replace')
-                elif part['mimeType'] == 'text/html':
-                    data = part['body']['data']
-                    data += '=' * (-len(data) % 4)
-                    html_content = base64.urlsafe_b64decode(data).decode('utf-8', errors='replace')
-                    # If we haven't found plain text yet, or if we want to append cleaned HTML
-                    if not body:
-                        soup = BeautifulSoup(html_content, 'html.parser')
-                        body = soup.get_text(separator=' ', strip=True)
-            return body.strip()
-        else:
-            # Single part email
-            data = payload['body']['data']
-            data += '=' * (-len(data) % 4)
-            content = base64.urlsafe_b64decode(data).decode('utf-8', errors='replace')
-            if payload['mimeType'] == 'text/html':
-                soup = BeautifulSoup(content, 'html.parser')
-                return soup.get_text(separator=' ', strip=True)
-            return content
\ No newline at end of file
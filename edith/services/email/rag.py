@@ -1,8 +1,13 @@
+import asyncio
+import queue
+import logging
+import threading
 import chromadb
-from chromadb.utils import embedding_functions
+import numpy as np
 from google import genai
 from google.genai import types
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from edith.lib.shared.models.email import EmailMessage
@@ -10,6 +15,49 @@ from edith.config import EmailAssistantConfig
 from edith.services.security.scrubber import PIIScrubber
 from edith.services.security.encryption import DataEncryptor
 from edith.services.security.guard import PromptGuard
+from edith.lib.shared.vector.cache import EmbeddingCache
+from edith.lib.shared.vector.helpers import get_embedding_fn, mmr, cluster_by_similarity, cosine_top_k, quantize_int8, split_words, EMBEDDING_MAX_SEQ_LENGTH
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on concurrent Gemini calls in answer_questions (keeps us under rate limits)
+ANSWER_MAX_WORKERS = 8
+# HNSW index of the email collection. More neighbors (max_neighbors, default 16) and a wider
+# construction beam (ef_construction, default 100) cost build time and memory for better recall;
+# ef_search (default 10) widens the query beam, trading a little latency for recall at large sizes
+HNSW_CONFIG = {
+    "space": "cosine",
+    "max_neighbors": 24,
+    "ef_construction": 128,
+    "ef_search": 100,
+    "batch_size": 500,
+    "sync_threshold": 2000,
+}
+# Records per upsert call when indexing
+UPSERT_BATCH_SIZE = 250
+# Indexing threads encrypting batches ahead of the embedder, and how many embedded batches
+# may wait for the Chroma writer (bounds memory when the writer falls behind)
+INGEST_ENCRYPT_WORKERS = 4
+INGEST_QUEUE_SIZE = 2
+# Email bodies are indexed as overlapping word windows that must fit, together with the
+# Subject/From/Date header, in the embedding model's 256-token window (anything past it is
+# silently truncated). WordPiece spends ~1.3-2 tokens per English word, so ~120 words plus
+# the header stay inside; the character cap bounds windows of URLs, numbers or CJK text.
+# With a sentence-transformers model the windows are measured with its own tokenizer.
+CHUNK_WORDS = 120
+CHUNK_OVERLAP_WORDS = 16
+CHUNK_MAX_CHARS = 480
+MAX_CHUNKS_PER_EMAIL = 8
+# Search over-retrieves this many candidates per requested result, then MMR-reranks them
+MMR_FETCH_MULTIPLIER = 3
+# Up to this many indexed chunks, search scans the in-process embedding matrix exactly instead of
+# querying Chroma's HNSW index (a personal inbox stays well below it, and one matmul is faster).
+# Only with a local (single-writer) store: a shared server can change vectors without this process
+BRUTE_FORCE_MAX_RECORDS = 10_000
+# Context clustering (config.rag_cluster_context): emails closer than this cosine distance are
+# summarized together, and result sets smaller than the minimum are passed through verbatim
+RAG_CLUSTER_DISTANCE = 0.3
+RAG_CLUSTER_MIN_RESULTS = 6
 
 class EmailRAGSystem:
     def __init__(self, config: EmailAssistantConfig):
@@ -18,22 +66,49 @@ class EmailRAGSystem:
         
         # Initialize ChromaDB
         if config.chroma_server_host:
-            print(f"   🔌 Connecting to ChromaDB Server at {config.chroma_server_host}:{config.chroma_server_port}...")
+            logger.info("🔌 Connecting to ChromaDB Server at %s:%s...", config.chroma_server_host, config.chroma_server_port)
             self.chroma_client = chromadb.HttpClient(
                 host=config.chroma_server_host, 
                 port=config.chroma_server_port
             )
+        elif config.chroma_in_memory:
+            self.chroma_client = chromadb.EphemeralClient()
         else:
             self.chroma_client = chromadb.PersistentClient(path=config.chroma_db_path)
+        # A shared Chroma server has other writers (e.g. every API worker) that may re-index ids
+        # behind this process's back, so only a local store can be searched from the in-process copy
+        self._single_writer = not config.chroma_server_host
             
+        # The HNSW parameters only take effect when the collection is first created
         self.collection = self.chroma_client.get_or_create_collection(
             name="email_knowledge",
-            metadata={"hnsw:space": "cosine"}
+            configuration={"hnsw": HNSW_CONFIG}
         )
         
         # Explicitly load embedding function so we can generate embeddings on plaintext
-        # before encrypting the content for storage.
-        self.embedding_fn = embedding_functions.DefaultEmbeddingFunction()
+        # before encrypting the content for storage. Queries are embedded with the same function.
+        self.embedding_fn = get_embedding_fn(config.embedding_model, config.embedding_device)
+        # Embeddings are deterministic, so unchanged documents are looked up instead of re-encoded
+        self._embedding_cache = (
+            EmbeddingCache(config.embedding_cache_path, config.embedding_model)
+            if config.embedding_cache_path else None
+        )
+        
+        # In-process copy of the indexed embeddings (one contiguous int8 row per email id), so the
+        # reranker reads candidate vectors locally instead of shipping them back from Chroma.
+        # Chroma keeps the float32 vectors (4x larger); with a local store this process is the only
+        # writer, so small collections are also searched from this copy (see _brute_force_query).
+        self._embedding_matrix: Optional[np.ndarray] = None
+        self._id_to_row: Dict[str, int] = {}
+        # Reverse index of the matrix; rows of deleted ids are None and never match a search
+        self._row_ids: List[Optional[str]] = []
+        self._embedding_lock = threading.Lock()
+        
+        # Generation settings are immutable, so build (and validate) them once instead of per call
+        self._answer_config = types.GenerateContentConfig(
+            temperature=0.3,  # Lower temperature for more factual answers
+        )
+        self._summary_config = types.GenerateContentConfig(temperature=0.0)
         
         # Initialize Privacy Scrubber
         self.scrubber = PIIScrubber()
@@ -45,126 +120,466 @@ class EmailRAGSystem:
     def index_emails(self, emails: List[EmailMessage]):
         """Index relevant emails in the vector database"""
         documents = []
+        records = []
         metadatas = []
         ids = []
+        reindexed = []
         
         for email in emails:
             if email.is_relevant:
                 # Security Check: Prompt Injection
                 if not self.prompt_guard.validate(email.subject + " " + email.body):
-                    print(f"   🛡️ Security Alert: Skipping email '{email.subject[:30]}...' due to potential prompt injection.")
+                    logger.warning("🛡️ Security Alert: Skipping email '%.30s...' due to potential prompt injection.", email.subject)
                     continue
 
-                # Create a searchable document
-                doc_text = f"""
-                Subject: {email.subject}
-                From: {email.sender}
-                Date: {email.date.strftime('%Y-%m-%d')}
-                Body: {email.body[:1000]}  # Limit body length for indexing
-                """
-                
-                # 1. Generate Embedding on PLAINTEXT (so search works)
-                # We do this later in batch, just preparing lists here
-                plain_doc = doc_text.strip()
-                documents.append(plain_doc)
-                
-                # 2. Prepare Metadata (Encrypt sensitive fields)
-                metadatas.append({
-                    'email_id': email.id,
-                    'subject': self.encryptor.encrypt(email.subject),
-                    'sender': self.encryptor.encrypt(email.sender),
-                    'date': email.date.isoformat(),
-                    'account_type': email.account_type
-                })
-                ids.append(email.id)
+                # Long bodies are split so the search can match the relevant paragraph; the first
+                # chunk keeps the email id, later ones get "<id>#chunk<n>" and point back via email_id
+                chunks = self._chunk_body(email)
+                reindexed.append(email.id)
+                for chunk_index, chunk in enumerate(chunks):
+                    # 1. Generate Embedding on PLAINTEXT (so search works)
+                    # We do this later in batch, just preparing lists here
+                    plain_doc = self._document_text(email, chunk)
+                    documents.append(plain_doc)
+                    
+                    # 2. Sensitive fields (subject, sender, document) are encrypted as one record below
+                    records.append([email.subject, email.sender, plain_doc])
+                    
+                    # Prepare Metadata (non-sensitive fields only)
+                    metadatas.append({
+                        'email_id': email.id,
+                        'chunk': chunk_index,
+                        'date': email.date.isoformat(),
+                        'account_type': email.account_type
+                    })
+                    ids.append(email.id if chunk_index == 0 else f"{email.id}#chunk{chunk_index}")
         
         if documents:
-            # Generate embeddings on plaintext
-            embeddings = self.embedding_fn(documents)
+            # Drop the extra chunks of re-indexed emails, their bodies may have fewer chunks now
+            self.collection.delete(where={"$and": [{"email_id": {"$in": reindexed}}, {"chunk": {"$gt": 0}}]})
+            new_ids = set(ids)
+            self._forget_embeddings([
+                chunk_id for email_id in reindexed for n in range(1, MAX_CHUNKS_PER_EMAIL)
+                if (chunk_id := f"{email_id}#chunk{n}") not in new_ids
+            ])
             
-            # 3. Encrypt Document Content for Storage
-            encrypted_documents = [self.encryptor.encrypt(doc) for doc in documents]
+            # Ingest in moderate batches rather than one jumbo call, as a three-stage pipeline:
+            # worker threads encrypt ahead, this thread embeds batch i, and a writer thread
+            # upserts batch i-1 (AES-GCM and Chroma's writes release the GIL)
+            starts = range(0, len(ids), UPSERT_BATCH_SIZE)
+            upserts = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+            writer_errors = []
             
-            # Add to ChromaDB
-            self.collection.upsert(
-                documents=encrypted_documents,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                ids=ids
-            )
+            def write_batches():
+                while (batch := upserts.get()) is not None:
+                    if writer_errors:
+                        continue  # keep draining so the producer never blocks
+                    try:
+                        self.collection.upsert(**batch)
+                    except Exception as e:
+                        writer_errors.append(e)
+                        continue
+                    # Only rows Chroma actually stored may enter the in-process matrix
+                    self._cache_embeddings(batch['ids'], batch['embeddings'])
+            
+            writer = threading.Thread(target=write_batches, daemon=True)
+            writer.start()
+            try:
+                with ThreadPoolExecutor(max_workers=INGEST_ENCRYPT_WORKERS) as executor:
+                    # 3. Sensitive records are encrypted per batch for storage
+                    encrypted_batches = executor.map(
+                        self.encryptor.encrypt_batch,
+                        [records[i:i + UPSERT_BATCH_SIZE] for i in starts]
+                    )
+                    for i, encrypted_documents in zip(starts, encrypted_batches):
+                        batch_ids = ids[i:i + UPSERT_BATCH_SIZE]
+                        # Generate embeddings on plaintext
+                        embeddings = self._embed_documents(documents[i:i + UPSERT_BATCH_SIZE])
+                        upserts.put({
+                            'documents': encrypted_documents,
+                            'embeddings': embeddings,
+                            'metadatas': metadatas[i:i + UPSERT_BATCH_SIZE],
+                            'ids': batch_ids
+                        })
+            finally:
+                upserts.put(None)
+                writer.join()
+            if writer_errors:
+                raise writer_errors[0]
+    
+    def _document_text(self, email: EmailMessage, chunk: str) -> str:
+        """Searchable document of one body chunk"""
+        doc_text = f"""
+                    Subject: {email.subject}
+                    From: {email.sender}
+                    Date: {email.date.strftime('%Y-%m-%d')}
+                    Body: {chunk}
+                    """
+        return doc_text.strip()
+    
+    def _chunk_body(self, email: EmailMessage) -> List[str]:
+        """Splits the body into windows that fit the embedding model next to the document header"""
+        count_tokens = getattr(self.embedding_fn, "count_tokens", None)
+        max_tokens = None
+        if count_tokens:
+            max_tokens = max(1, EMBEDDING_MAX_SEQ_LENGTH - count_tokens(self._document_text(email, "")))
+        return split_words(
+            email.body, CHUNK_WORDS, CHUNK_OVERLAP_WORDS, MAX_CHUNKS_PER_EMAIL,
+            max_chars=CHUNK_MAX_CHARS, count_tokens=count_tokens, max_tokens=max_tokens
+        )
+    
+    def _embed_documents(self, documents: List[str]) -> np.ndarray:
+        """Embeds documents as float32 rows, only running the model on cache misses"""
+        if self._embedding_cache is None:
+            return np.asarray(self.embedding_fn(documents), dtype=np.float32)
+        
+        keys = [self._embedding_cache.key(doc) for doc in documents]
+        cached = self._embedding_cache.get_many(keys)
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        
+        if missing:
+            fresh = np.asarray(self.embedding_fn([documents[i] for i in missing]), dtype=np.float32)
+            self._embedding_cache.put_many([keys[i] for i in missing], fresh)
+            cached.update(zip((keys[i] for i in missing), fresh))
+        return np.stack([cached[key] for key in keys])
     
     def search_emails(self, query: str, n_results: int = 30) -> List[Dict[str, Any]]:
         """Search for relevant emails based on a query"""
+        return self.search_emails_batch([query], n_results=n_results)[0]
+    
+    def search_emails_batch(self, queries: List[str], n_results: int = 30) -> List[List[Dict[str, Any]]]:
+        """Search for several queries at once: one embedding pass and one vector DB round trip"""
+        if not queries:
+            return []
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
+            query_embeddings = self.embedding_fn(queries)
+            results = self._brute_force_query(query_embeddings, n_results * MMR_FETCH_MULTIPLIER)
+            if results is None:
+                results = self.collection.query(
+                    query_embeddings=query_embeddings,
+                    n_results=n_results * MMR_FETCH_MULTIPLIER,
+                    include=['documents', 'metadatas', 'distances']
+                )
             
-            search_results = []
-            if results['documents'] and results['documents'][0]:
-                for i, doc in enumerate(results['documents'][0]):
-                    metadata = results['metadatas'][0][i]
-                    
-                    # Decrypt data for application use
-                    decrypted_doc = self.encryptor.decrypt(doc)
-                    metadata['subject'] = self.encryptor.decrypt(metadata['subject'])
-                    metadata['sender'] = self.encryptor.decrypt(metadata['sender'])
-                    
-                    # Security Check: Filter out unsafe content on retrieval (Defense in Depth)
-                    if not self.prompt_guard.validate(decrypted_doc) or not self.prompt_guard.validate(metadata['subject']):
-                        print(f"   🛡️ Security Alert: Excluded retrieved document '{metadata['subject']}' due to potential prompt injection.")
-                        continue
-                    
-                    search_results.append({
-                        'document': decrypted_doc,
-                        'metadata': metadata,
-                        'distance': results['distances'][0][i] if 'distances' in results else 0
-                    })
+            if not results['documents']:
+                return [[] for _ in queries]
             
+            search_results = []
+            for i, documents in enumerate(results['documents']):
+                metadatas = results['metadatas'][i]
+                distances = results['distances'][i] if results.get('distances') else None
+                
+                # Several chunks of one email can match: keep only its closest chunk
+                # (candidates come back nearest first)
+                seen = set()
+                keep = []
+                for j, metadata in enumerate(metadatas):
+                    if metadata['email_id'] not in seen:
+                        seen.add(metadata['email_id'])
+                        keep.append(j)
+                documents = [documents[j] for j in keep]
+                metadatas = [metadatas[j] for j in keep]
+                if distances is not None:
+                    distances = [distances[j] for j in keep]
+                
+                # Rerank the candidates for diversity (e.g. drop near-identical thread replies);
+                # the embeddings are only used here and never leave this method
+                candidate_embeddings = self._embeddings_for([results['ids'][i][j] for j in keep])
+                order = mmr(query_embeddings[i], candidate_embeddings, n_results)
+                # Cluster labels (not the embeddings) are what the context summarization needs
+                clusters = None
+                if self.config.rag_cluster_context and len(order) >= RAG_CLUSTER_MIN_RESULTS:
+                    clusters = cluster_by_similarity(candidate_embeddings[order], RAG_CLUSTER_DISTANCE)
+                search_results.append(self._build_search_results(
+                    [documents[j] for j in order],
+                    [metadatas[j] for j in order],
+                    [distances[j] for j in order] if distances is not None else None,
+                    clusters
+                ))
             return search_results
         except Exception as e:
-            print(f"Error searching emails: {e}")
-            return []
+            logger.error("Error searching emails: %s", e)
+            return [[] for _ in queries]
+    
+    def _brute_force_query(self, query_embeddings, n_results: int) -> Optional[Dict[str, List[List[Any]]]]:
+        """
+        Small-corpus fast path of search_emails_batch: exact cosine top-k over the embedding matrix,
+        returned in the shape of collection.query. None when the collection is too large or shared
+        with other writers (the matrix could then hold stale vectors).
+        """
+        if not self._single_writer:
+            return None
+        count = self.collection.count()
+        if count == 0 or count > BRUTE_FORCE_MAX_RECORDS:
+            return None
+        
+        with self._embedding_lock:
+            complete = len(self._id_to_row) >= count
+        if not complete:
+            # First search after a restart (or after another process indexed): load what is missing
+            all_ids = self.collection.get(include=[])['ids']
+            with self._embedding_lock:
+                missing = [record_id for record_id in all_ids if record_id not in self._id_to_row]
+            self._embeddings_for(missing)
+        
+        with self._embedding_lock:
+            if len(self._id_to_row) != count:
+                return None
+            matrix = self._embedding_matrix
+            row_ids = list(self._row_ids)
+        
+        # Rows of deleted chunks are masked out (they only exist after a re-index shrank an email)
+        exclude = None
+        if len(row_ids) != count:
+            exclude = np.fromiter((record_id is None for record_id in row_ids), dtype=bool, count=len(row_ids))
+        top_rows, top_sims = cosine_top_k(matrix, query_embeddings, n_results, exclude)
+        
+        # One round trip for the documents of every query's hits
+        hit_ids = [[row_ids[row] for row in rows] for rows in top_rows.tolist()]
+        fetched = self.collection.get(
+            ids=list({record_id for ids in hit_ids for record_id in ids}),
+            include=['documents', 'metadatas']
+        )
+        records = {
+            record_id: (doc, metadata)
+            for record_id, doc, metadata in zip(fetched['ids'], fetched['documents'], fetched['metadatas'])
+        }
+        
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        for ids, sims in zip(hit_ids, top_sims.tolist()):
+            # Cosine distance, as reported by the HNSW index
+            hits = [(record_id, 1.0 - sim) for record_id, sim in zip(ids, sims) if record_id in records]
+            results['ids'].append([record_id for record_id, _ in hits])
+            results['documents'].append([records[record_id][0] for record_id, _ in hits])
+            results['metadatas'].append([records[record_id][1] for record_id, _ in hits])
+            results['distances'].append([distance for _, distance in hits])
+        return results
+    
+    def _cache_embeddings(self, ids: List[str], embeddings: np.ndarray):
+        """Quantizes the embeddings, writes the rows of re-indexed ids in place and appends new ids in one block"""
+        # The consumers (MMR, clustering) only need cosine similarity, which normalizes each
+        # row, so the per-row scales are not kept
+        embeddings, _ = quantize_int8(embeddings)
+        with self._embedding_lock:
+            if self._embedding_matrix is None:
+                self._embedding_matrix = np.empty((0, embeddings.shape[1]), dtype=np.int8)
+            
+            new_ids, new_rows = [], []
+            for i, email_id in enumerate(ids):
+                row = self._id_to_row.get(email_id)
+                if row is None:
+                    self._id_to_row[email_id] = len(self._embedding_matrix) + len(new_ids)
+                    self._row_ids.append(email_id)
+                    new_ids.append(email_id)
+                    new_rows.append(i)
+                else:
+                    self._embedding_matrix[row] = embeddings[i]
+            
+            if new_rows:
+                self._embedding_matrix = np.vstack([self._embedding_matrix, embeddings[new_rows]])
+    
+    def _forget_embeddings(self, ids: List[str]):
+        """Unlinks the rows of deleted ids; the rows stay allocated but are never matched again"""
+        with self._embedding_lock:
+            for email_id in ids:
+                row = self._id_to_row.pop(email_id, None)
+                if row is not None:
+                    self._row_ids[row] = None
+    
+    def _embeddings_for(self, ids: List[str]) -> np.ndarray:
+        """
+        Embedding rows of the given ids. Ids indexed by another process (or before a restart)
+        are fetched from Chroma once and kept in the matrix.
+        """
+        if not ids:
+            return np.empty((0, 0), dtype=np.float32)
+        with self._embedding_lock:
+            missing = [email_id for email_id in ids if email_id not in self._id_to_row]
+        if missing:
+            fetched = self.collection.get(ids=missing, include=['embeddings'])
+            self._cache_embeddings(fetched['ids'], np.asarray(fetched['embeddings'], dtype=np.float32))
+        
+        with self._embedding_lock:
+            rows = self._embedding_matrix[[self._id_to_row[email_id] for email_id in ids]]
+        # Widen the few candidate rows so the similarity products run as float32 BLAS matmuls
+        return rows.astype(np.float32)
+    
+    def _build_search_results(self, documents: List[str], metadatas: List[Dict], distances: Optional[List[float]], clusters: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """Decrypts and guards the hits of a single query"""
+        search_results = []
+        if not documents:
+            return search_results
+        
+        distances = distances or [0] * len(documents)
+        
+        # Decrypt data for application use, column by column (all tokens in one batch call)
+        decrypted_docs, subjects, senders = self._decrypt_records(documents, metadatas)
+        
+        # Security Check: Filter out unsafe content on retrieval (Defense in Depth)
+        kept = []
+        for i, (doc, subject) in enumerate(zip(decrypted_docs, subjects)):
+            if self.prompt_guard.validate(doc) and self.prompt_guard.validate(subject):
+                kept.append(i)
+            else:
+                logger.warning("🛡️ Security Alert: Excluded retrieved document '%s' due to potential prompt injection.", subject)
+        
+        search_results = [
+            {
+                'document': decrypted_docs[i],
+                'metadata': {**metadatas[i], 'subject': subjects[i], 'sender': senders[i]},
+                'distance': distances[i]
+            }
+            for i in kept
+        ]
+        if clusters is not None:
+            for result, i in zip(search_results, kept):
+                result['cluster'] = clusters[i]
+        return search_results
+    
+    def _decrypt_records(self, documents: List[str], metadatas: List[Dict]) -> Tuple[List[str], List[str], List[str]]:
+        """Returns the (documents, subjects, senders) columns of stored emails"""
+        failed = ("[Decryption Failed]",) * 3
+        # Legacy documents are decrypted field by field below, so they are left out of the batch
+        records = self.encryptor.decrypt_batch([
+            "" if 'subject' in metadata else doc for doc, metadata in zip(documents, metadatas)
+        ])
+        
+        columns = []
+        for doc, metadata, fields in zip(documents, metadatas, records):
+            if 'subject' in metadata:
+                # Indexed before subject/sender moved into the document record: one token per field
+                columns.append((
+                    self.encryptor.decrypt(doc),
+                    self.encryptor.decrypt(metadata['subject']),
+                    self.encryptor.decrypt(metadata['sender'])
+                ))
+            elif len(fields) == 3:
+                subject, sender, decrypted_doc = fields
+                columns.append((decrypted_doc, subject, sender))
+            else:
+                columns.append(failed)
+        return tuple(map(list, zip(*columns)))
     
     def answer_question(self, question: str, additional_context: str = "", return_sources: bool = False, n_results: int = 30) -> Union[str, Dict[str, Any]]:
         """Answer a user's question using RAG"""
         
         # 1. Input Guard: Check the user's question for injection attempts
         if not self.prompt_guard.validate(question):
-            msg = "I cannot answer this question as it triggered a security alert (Prompt Injection detected)."
-            if return_sources:
-                return {"answer": msg, "sources": [], "context_used": ""}
-            return msg
+            return self._blocked_answer(return_sources)
             
-        print(f"   [RAG] Querying vector DB for: '{question}'")
+        logger.info("[RAG] Querying vector DB for: '%s'", question)
         # Search for relevant emails
         search_results = self.search_emails(question, n_results=n_results)
+        return self._generate_answer(question, search_results, additional_context, return_sources)
+    
+    def answer_questions(self, questions: List[str], additional_context: str = "", return_sources: bool = False, n_results: int = 30) -> List[Union[str, Dict[str, Any]]]:
+        """
+        Answer several questions: retrieval for all of them is one batched vector DB query,
+        the Gemini calls then run concurrently. Answers come back in question order.
+        """
+        answers: List[Union[str, Dict[str, Any]]] = [None] * len(questions)
+        
+        # 1. Input Guard per question; only the safe ones are retrieved and answered
+        safe = []
+        for i, question in enumerate(questions):
+            if self.prompt_guard.validate(question):
+                safe.append(i)
+            else:
+                answers[i] = self._blocked_answer(return_sources)
+        
+        logger.info("[RAG] Querying vector DB for %d questions in one batch", len(safe))
+        batch_results = self.search_emails_batch([questions[i] for i in safe], n_results=n_results)
         
+        def generate(item):
+            i, search_results = item
+            return i, self._generate_answer(questions[i], search_results, additional_context, return_sources)
+        
+        if safe:
+            with ThreadPoolExecutor(max_workers=min(ANSWER_MAX_WORKERS, len(safe))) as executor:
+                for i, answer in executor.map(generate, zip(safe, batch_results)):
+                    answers[i] = answer
+        
+        return answers
+    
+    def _blocked_answer(self, return_sources: bool) -> Union[str, Dict[str, Any]]:
+        msg = "I cannot answer this question as it triggered a security alert (Prompt Injection detected)."
+        if return_sources:
+            return {"answer": msg, "sources": [], "context_used": ""}
+        return msg
+    
+    def _generate_answer(self, question: str, search_results: List[Dict[str, Any]], additional_context: str, return_sources: bool) -> Union[str, Dict[str, Any]]:
+        """Builds the prompt from the retrieved emails and asks Gemini for the answer"""
+        prompt, email_context = self._build_answer_prompt(question, search_results, additional_context)
+        if prompt is None:
+            return self._no_context_answer(return_sources)
+        
+        # Generate answer using Gemini
+        try:
+            # --- Privacy Layer: Scrub PII before sending to LLM ---
+            scrubbed_prompt, pii_mapping = self.scrubber.scrub(prompt)
+            
+            response = self.client.models.generate_content(
+                model=self.config.gemini_model,
+                contents=scrubbed_prompt,
+                config=self._answer_config
+            )
+            
+            # --- Privacy Layer: Restore PII in the response ---
+            final_answer = self.scrubber.restore(response.text, pii_mapping)
+            return self._final_answer(final_answer, search_results, email_context, return_sources)
+        except Exception as e:
+            return self._failed_answer(e, return_sources)
+    
+    async def answer_question_async(self, question: str, additional_context: str = "", return_sources: bool = False, n_results: int = 30) -> Union[str, Dict[str, Any]]:
+        """
+        answer_question for async callers: retrieval (Chroma + decryption) runs on a worker thread
+        and the Gemini call goes through the async client, so the event loop is never blocked.
+        """
+        if not self.prompt_guard.validate(question):
+            return self._blocked_answer(return_sources)
+        
+        logger.info("[RAG] Querying vector DB for: '%s'", question)
+        
+        def retrieve():
+            search_results = self.search_emails(question, n_results=n_results)
+            return search_results, self._build_answer_prompt(question, search_results, additional_context)
+        
+        search_results, (prompt, email_context) = await asyncio.to_thread(retrieve)
+        if prompt is None:
+            return self._no_context_answer(return_sources)
+        
+        try:
+            scrubbed_prompt, pii_mapping = self.scrubber.scrub(prompt)
+            
+            response = await self.client.aio.models.generate_content(
+                model=self.config.gemini_model,
+                contents=scrubbed_prompt,
+                config=self._answer_config
+            )
+            
+            final_answer = self.scrubber.restore(response.text, pii_mapping)
+            return self._final_answer(final_answer, search_results, email_context, return_sources)
+        except Exception as e:
+            return self._failed_answer(e, return_sources)
+    
+    def _build_answer_prompt(self, question: str, search_results: List[Dict[str, Any]], additional_context: str) -> Tuple[Optional[str], str]:
+        """Returns (prompt, email_context); the prompt is None when there is nothing to answer from"""
         if search_results:
-            print(f"   [RAG] Retrieved {len(search_results)} context documents:")
-            for res in search_results:
-                print(f"      - {res['metadata']['subject']} (Score: {res.get('distance', 0):.4f})")
+            logger.info("[RAG] Retrieved %d context documents", len(search_results))
+            # The per-document listing is only built when debug logging is on
+            if logger.isEnabledFor(logging.DEBUG):
+                for res in search_results:
+                    logger.debug("   - %s (Score: %.4f)", res['metadata']['subject'], res.get('distance', 0))
         
         if not search_results and not additional_context:
-            msg = "I couldn't find any relevant emails to answer your question."
-            if return_sources:
-                return {"answer": msg, "sources": [], "context_used": ""}
-            return msg
+            return None, ""
         
         # Build context from search results
         email_context = "No relevant emails found."
         if search_results:
-            email_context = "\n\n".join([
-                f"Email from {result['metadata']['sender']} on {result['metadata']['date']}:\n"
-                f"Subject: {result['metadata']['subject']}\n"
-                f"Content: {result['document']}"
-                for result in search_results
-            ])
+            email_context = self._build_email_context(search_results)
         
-        # Generate answer using Gemini
-        try:
-            prompt = f"""You are Edith, an intelligent and helpful personal AI assistant.
+        prompt = f"""You are Edith, an intelligent and helpful personal AI assistant.
 Your goal is to help the user manage their digital life by synthesizing information from their emails and calendar.
 
 Guidelines:
@@ -184,36 +599,83 @@ Email Context:
 </email_context>
 
 Question: {question}"""
-            
-            # --- Privacy Layer: Scrub PII before sending to LLM ---
+        return prompt, email_context
+    
+    def _no_context_answer(self, return_sources: bool) -> Union[str, Dict[str, Any]]:
+        msg = "I couldn't find any relevant emails to answer your question."
+        if return_sources:
+            return {"answer": msg, "sources": [], "context_used": ""}
+        return msg
+    
+    def _final_answer(self, answer: str, search_results: List[Dict[str, Any]], email_context: str, return_sources: bool) -> Union[str, Dict[str, Any]]:
+        if return_sources:
+            return {
+                "answer": answer,
+                "sources": search_results,
+                "context_used": email_context
+            }
+        return answer
+    
+    def _failed_answer(self, e: Exception, return_sources: bool) -> Union[str, Dict[str, Any]]:
+        logger.error("Error generating answer: %s", e)
+        if "404" in str(e) and "models/" in str(e):
+            logger.warning("⚠️  Tip: Try setting GEMINI_MODEL='gemini-2.5-flash' in your .env file.")
+        msg = "I'm having trouble processing your question right now."
+        if return_sources:
+            return {"answer": msg, "sources": [], "context_used": ""}
+        return msg
+    
+    def _build_email_context(self, search_results: List[Dict[str, Any]]) -> str:
+        """
+        Formats the retrieved emails for the prompt. When the search attached cluster labels,
+        each group of similar emails is replaced by one short summary; singletons stay verbatim.
+        """
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for i, result in enumerate(search_results):
+            groups.setdefault(result.get('cluster', ('single', i)), []).append(result)
+        
+        multi = [group for group in groups.values() if len(group) > 1]
+        summaries = {}
+        if multi:
+            with ThreadPoolExecutor(max_workers=min(ANSWER_MAX_WORKERS, len(multi))) as executor:
+                summaries = dict(zip(map(id, multi), executor.map(self._summarize_emails, multi)))
+        
+        parts = []
+        for group in groups.values():
+            summary = summaries.get(id(group))
+            if summary:
+                parts.append(f"Summary of {len(group)} related emails:\n{summary}")
+            else:
+                parts.extend(self._format_email(result) for result in group)
+        return "\n\n".join(parts)
+    
+    def _format_email(self, result: Dict[str, Any]) -> str:
+        return (
+            f"Email from {result['metadata']['sender']} on {result['metadata']['date']}:\n"
+            f"Subject: {result['metadata']['subject']}\n"
+            f"Content: {result['document']}"
+        )
+    
+    def _summarize_emails(self, results: List[Dict[str, Any]]) -> Optional[str]:
+        """Condenses a group of similar emails into one passage; None keeps them verbatim"""
+        emails = "\n\n".join(self._format_email(result) for result in results)
+        prompt = f"""Summarize these related emails in a few sentences. Keep every date, time, name, decision and action item.
+
+Emails:
+{emails}"""
+        
+        try:
+            # Same privacy layer as the answer prompt
             scrubbed_prompt, pii_mapping = self.scrubber.scrub(prompt)
-            
             response = self.client.models.generate_content(
                 model=self.config.gemini_model,
                 contents=scrubbed_prompt,
-                config=types.GenerateContentConfig(
-                    temperature=0.3,  # Lower temperature for more factual answers
-                )
+                config=self._summary_config
             )
-            
-            # --- Privacy Layer: Restore PII in the response ---
-            final_answer = self.scrubber.restore(response.text, pii_mapping)
-            
-            if return_sources:
-                return {
-                    "answer": final_answer,
-                    "sources": search_results,
-                    "context_used": email_context
-                }
-            return final_answer
+            return self.scrubber.restore(response.text, pii_mapping)
         except Exception as e:
-            print(f"Error generating answer: {e}")
-            if "404" in str(e) and "models/" in str(e):
-                print(f"⚠️  Tip: Try setting GEMINI_MODEL='gemini-2.5-flash' in your .env file.")
-            msg = "I'm having trouble processing your question right now."
-            if return_sources:
-                return {"answer": msg, "sources": [], "context_used": ""}
-            return msg
+            logger.error("Error summarizing emails: %s", e)
+            return None
     
     def get_email_summary(self, days: int = 7) -> str:
         """Get a summary of recent emails"""
@@ -239,13 +701,11 @@ Emails:
             response = self.client.models.generate_content(
                 model=self.config.gemini_model,
                 contents=prompt,
-                config=types.GenerateContentConfig(
-                    temperature=0.3,
-                )
+                config=self._answer_config
             )
             return response.text
         except Exception as e:
-            print(f"Error generating summary: {e}")
+            logger.error("Error generating summary: %s", e)
             return "I'm having trouble generating a summary right now."
 
     def transcribe_audio(self, audio_bytes: bytes, mime_type: str = "audio/mp3") -> str:
@@ -268,5 +728,5 @@ Emails:
                 
             return transcript
         except Exception as e:
-            print(f"Error transcribing audio: {e}")
+            logger.error("Error transcribing audio: %s", e)
             return "Error processing audio file."
\ No newline at end of file
@@ -1,49 +1,72 @@
 import asyncio
+import heapq
+import logging
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Set
+from typing import List, Optional, Set, Tuple
 
+from edith.lib.shared.models.calendar import CalendarEvent
 from edith.services.calendar.service import CalendarService
 
+logger = logging.getLogger(__name__)
+
+# Notify this long before an event starts
+REMINDER_WINDOW = timedelta(minutes=15)
+# How often the next 24h of events is re-fetched; ticks in between only peek at the heap
+EVENTS_REFRESH_SECONDS = 300
+
 class NotificationService:
     def __init__(self, calendar_service: CalendarService):
         self.calendar_service = calendar_service
         self.notified_events: Set[str] = set()
         self.is_running = False
+        # Min-heap of (start_time, tiebreaker, event) for events not notified yet
+        self._upcoming: List[Tuple[datetime, int, CalendarEvent]] = []
+        self._last_refresh: Optional[float] = None
         
     async def start_monitoring(self, interval_seconds: int = 60):
         """Starts the background monitoring loop."""
         self.is_running = True
-        print("🔔 Notification Service: Started monitoring for upcoming events.")
+        logger.info("🔔 Notification Service: Started monitoring for upcoming events.")
         
         while self.is_running:
             try:
                 if self.calendar_service.service:
                     await self._check_upcoming_events()
             except Exception as e:
-                print(f"Error in notification loop: {e}")
+                logger.exception("Error in notification loop: %s", e)
             
             await asyncio.sleep(interval_seconds)
             
     async def _check_upcoming_events(self):
-        # Get events for the next 24 hours
-        events = self.calendar_service.get_events(days_ahead=1)
-        
         now = datetime.now(timezone.utc)
-        reminder_window = timedelta(minutes=15)
         
-        for event in events:
-            # Ensure event time is timezone-aware for comparison
-            if event.start_time.tzinfo is None:
-                continue
-                
-            time_until_start = event.start_time - now
+        if self._last_refresh is None or time.monotonic() - self._last_refresh >= EVENTS_REFRESH_SECONDS:
+            self._refresh_upcoming_events(now)
+        
+        # Only the events at the top of the heap can be inside the reminder window
+        while self._upcoming and self._upcoming[0][0] - now <= REMINDER_WINDOW:
+            start_time, _, event = heapq.heappop(self._upcoming)
+            time_until_start = start_time - now
             
-            # Check if event is within 15 minutes and hasn't been notified
-            if timedelta(seconds=0) < time_until_start <= reminder_window:
-                if event.id not in self.notified_events:
-                    self._send_notification(f"🔔 Reminder: '{event.title}' starts in {int(time_until_start.total_seconds() / 60)} minutes.")
-                    self.notified_events.add(event.id)
+            # Skip events that already started or were notified
+            if time_until_start > timedelta(seconds=0) and event.id not in self.notified_events:
+                self._send_notification(f"🔔 Reminder: '{event.title}' starts in {int(time_until_start.total_seconds() / 60)} minutes.")
+                self.notified_events.add(event.id)
+    
+    def _refresh_upcoming_events(self, now: datetime):
+        """Rebuilds the heap from the events of the next 24 hours"""
+        events = self.calendar_service.get_events(days_ahead=1)
+        
+        # Ensure event time is timezone-aware for comparison
+        self._upcoming = [
+            (event.start_time, i, event)
+            for i, event in enumerate(events)
+            if event.start_time.tzinfo is not None and event.start_time > now and event.id not in self.notified_events
+        ]
+        heapq.heapify(self._upcoming)
+        self._last_refresh = time.monotonic()
 
     def _send_notification(self, message: str):
         # In a real app, this would push to a WebSocket, Slack, or Mobile Push
-        print(f"\n{message}\n")
\ No newline at end of file
+        logger.info(message)
\ No newline at end of file
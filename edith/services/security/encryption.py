@@ -1,11 +1,28 @@
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 import base64
 import os
+import struct
+from functools import lru_cache
+from typing import List, Tuple
+
+# Decrypted tokens kept per DataEncryptor, so hot emails re-retrieved by every query skip Fernet
+DECRYPT_CACHE_SIZE = 4096
+
+# Record tokens: urlsafe base64(version byte || 12-byte nonce || AES-GCM ciphertext + tag).
+# Fernet tokens always start with 'g' (version byte 0x80), which base64 of 0x02 never does (always "A").
+RECORD_VERSION = 0x02
+NONCE_SIZE = 12
+# HKDF context, binds the derived AES-GCM key to this use of the configured key
+AEAD_KEY_INFO = b"edith-record-aesgcm-v2"
 
 class DataEncryptor:
     """
     Handles encryption and decryption of sensitive data at rest.
-    Uses Fernet (symmetric encryption).
+    Single values use Fernet (symmetric encryption); multi-field records use AES-GCM
+    under a key derived (HKDF) from the same configured key.
     """
     def __init__(self, key: str = None):
         if not key:
@@ -19,6 +36,13 @@ class DataEncryptor:
             key = base64.urlsafe_b64encode(b"edith_insecure_dev_key_000000000")
             
         self.fernet = Fernet(key)
+        self._aead = AESGCM(HKDF(
+            algorithm=hashes.SHA256(), length=32, salt=None, info=AEAD_KEY_INFO
+        ).derive(base64.urlsafe_b64decode(key)))
+        # Keyed on the token itself: every encryption yields a fresh token (random IV), so a
+        # re-indexed email never hits a stale entry. Per instance, so a key change starts empty.
+        self._decrypt_cached = lru_cache(maxsize=DECRYPT_CACHE_SIZE)(self._decrypt)
+        self._decrypt_many_cached = lru_cache(maxsize=DECRYPT_CACHE_SIZE)(self._decrypt_many)
 
     def encrypt(self, text: str) -> str:
         if not text: return ""
@@ -26,7 +50,64 @@ class DataEncryptor:
 
     def decrypt(self, token: str) -> str:
         if not token: return ""
+        return self._decrypt_cached(token)
+
+    def _decrypt(self, token: str) -> str:
         try:
             return self.fernet.decrypt(token.encode()).decode()
         except Exception:
-            return "[Decryption Failed]"
\ No newline at end of file
+            return "[Decryption Failed]"
+
+    def encrypt_many(self, texts: List[str]) -> str:
+        """Encrypts several fields into one record token, see encrypt_batch"""
+        return self.encrypt_batch([texts])[0]
+
+    def encrypt_batch(self, records: List[List[str]]) -> List[str]:
+        """
+        Encrypts one token per record. Each field is length-prefixed, all records share one
+        AES-GCM cipher object and the nonces come from a single os.urandom call.
+        """
+        nonces = os.urandom(NONCE_SIZE * len(records))
+        version = bytes([RECORD_VERSION])
+        tokens = []
+        for i, texts in enumerate(records):
+            payload = b"".join(
+                struct.pack("<I", len(data)) + data
+                for data in ((text or "").encode() for text in texts)
+            )
+            nonce = nonces[i * NONCE_SIZE:(i + 1) * NONCE_SIZE]
+            tokens.append(base64.urlsafe_b64encode(version + nonce + self._aead.encrypt(nonce, payload, None)).decode())
+        return tokens
+
+    def decrypt_many(self, token: str) -> List[str]:
+        """Reverses encrypt_many; returns an empty list if the token cannot be decrypted"""
+        if not token: return []
+        # The cache holds immutable tuples, callers get their own list
+        return list(self._decrypt_many_cached(token))
+
+    def decrypt_batch(self, tokens: List[str]) -> List[List[str]]:
+        """Reverses encrypt_batch: decrypt_many of every token, in order"""
+        return [list(self._decrypt_many_cached(token)) if token else [] for token in tokens]
+
+    def _decrypt_many(self, token: str) -> Tuple[str, ...]:
+        try:
+            if token.startswith("g"):
+                # Records written before the switch to AES-GCM
+                payload = self.fernet.decrypt(token.encode())
+            else:
+                raw = base64.urlsafe_b64decode(token)
+                if raw[0] != RECORD_VERSION:
+                    return ()
+                nonce = raw[1:1 + NONCE_SIZE]
+                payload = self._aead.decrypt(nonce, raw[1 + NONCE_SIZE:], None)
+            
+            fields = []
+            offset = 0
+            while offset < len(payload):
+                (length,) = struct.unpack_from("<I", payload, offset)
+                offset += 4
+                fields.append(payload[offset:offset + length].decode())
+                offset += length
+            return tuple(fields)
+        except Exception:
+            return ()
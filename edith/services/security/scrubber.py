@@ -19,38 +19,53 @@ class PIIScrubber:
             # IPv4 Address
             'IP_ADDRESS': re.compile(r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b')
         }
+        # Single alternation of every pattern, used to detect PII-free text in one scan
+        self._any_pii = re.compile("|".join(f"(?:{p.pattern})" for p in self.patterns.values()))
 
     def scrub(self, text: str) -> Tuple[str, Dict[str, str]]:
         """
         Replaces PII with unique placeholders (e.g., <EMAIL_1>) and returns
         a mapping to restore them later.
         """
-        mapping = {}
+        # Fast path: PII-free text (the common case) needs no substitution pass at all
+        if not self._any_pii.search(text):
+            return text, {}
+        
+        # Allocated lazily on the first match; `placeholders` is the reverse index
+        # (original -> placeholder) so repeated values don't scan the whole mapping
+        mapping = None
+        placeholders = None
         scrubbed_text = text
         
         for label, pattern in self.patterns.items():
             # We use a closure to maintain state (mapping) during substitution
             def replace_fn(match):
+                nonlocal mapping, placeholders
                 original_value = match.group(0)
                 
+                if mapping is None:
+                    mapping, placeholders = {}, {}
+                
                 # Check if we've already assigned a placeholder for this value
                 # (Consistency: john@doe.com should always be <EMAIL_1>)
-                for placeholder, original in mapping.items():
-                    if original == original_value:
-                        return placeholder
+                placeholder = placeholders.get(original_value)
+                if placeholder is not None:
+                    return placeholder
                 
                 # Create new placeholder
                 placeholder = f"<{label}_{len(mapping) + 1}>"
                 mapping[placeholder] = original_value
+                placeholders[original_value] = placeholder
                 return placeholder
 
             scrubbed_text = pattern.sub(replace_fn, scrubbed_text)
             
-        return scrubbed_text, mapping
+        return scrubbed_text, mapping or {}
 
     def restore(self, text: str, mapping: Dict[str, str]) -> str:
         """Restores PII from placeholders using the provided mapping."""
-        restored_text = text
-        for placeholder, original in mapping.items():
-            restored_text = restored_text.replace(placeholder, original)
-        return restored_text
\ No newline at end of file
+        if not mapping:
+            return text
+        # Placeholders are delimited (<LABEL_N>), so one alternation restores them all in a single scan
+        placeholder_pattern = re.compile("|".join(map(re.escape, mapping)))
+        return placeholder_pattern.sub(lambda match: mapping[match.group(0)], text)
\ No newline at end of file
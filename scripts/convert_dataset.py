@@ -0,0 +1,33 @@
+"""
+Converts the downloaded test dataset to Parquet, so the test factories read typed, compressed
+columns instead of re-parsing the CSV on every session.
+
+Requires pyarrow. Run after scripts/download_spam_dataset.py:
+    python scripts/convert_dataset.py
+"""
+
+import sys
+from pathlib import Path
+import pandas as pd
+
+INPUT_FILE = Path("tests/datasets/full_emails_dataset.csv")
+OUTPUT_FILE = INPUT_FILE.with_suffix(".parquet")
+# The only dataset columns the test factories read (see tests/factories.py)
+COLUMNS = ['id', 'subject', 'body', 'category_id']
+
+def convert_dataset():
+    if not INPUT_FILE.exists():
+        print(f"❌ Error: {INPUT_FILE} not found, run scripts/download_spam_dataset.py first")
+        sys.exit(1)
+
+    print(f"🔄 Converting {INPUT_FILE} to Parquet...")
+    df = pd.read_csv(INPUT_FILE, usecols=COLUMNS)
+    df.to_parquet(OUTPUT_FILE, compression='zstd', index=False)
+
+    print("✅ Dataset converted successfully!")
+    print(f"   Location: {OUTPUT_FILE}")
+    print(f"   Rows: {len(df)}")
+    print(f"   Size: {INPUT_FILE.stat().st_size / 1024 / 1024:.2f} MB -> {OUTPUT_FILE.stat().st_size / 1024 / 1024:.2f} MB")
+
+if __name__ == "__main__":
+    convert_dataset()
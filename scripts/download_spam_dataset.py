@@ -20,6 +20,8 @@ HF_TOKEN = os.getenv('HF_TOKEN')
 DATASET_URL = "https://huggingface.co/datasets/jason23322/high-accuracy-email-classifier/resolve/main/full_dataset.csv"
 OUTPUT_DIR = Path("tests/datasets")
 OUTPUT_FILE = OUTPUT_DIR / "full_emails_dataset.csv"
+CHUNK_SIZE = 1024 * 1024  # 1 MiB reads keep the per-chunk Python overhead negligible
+PROGRESS_EVERY_BYTES = 5 * 1024 * 1024  # refresh the progress line every 5 MiB
 
 def download_dataset():
     if not HF_TOKEN or HF_TOKEN == "YOUR_HF_TOKEN_HERE":
@@ -45,14 +47,16 @@ def download_dataset():
         # Download with progress
         total_size = int(response.headers.get('content-length', 0))
         downloaded = 0
+        next_report = PROGRESS_EVERY_BYTES
         
         with open(OUTPUT_FILE, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
                 f.write(chunk)
                 downloaded += len(chunk)
-                if total_size:
+                if total_size and (downloaded >= next_report or downloaded == total_size):
                     percent = (downloaded / total_size) * 100
                     print(f"\r   Progress: {percent:.1f}%", end='', flush=True)
+                    next_report = downloaded + PROGRESS_EVERY_BYTES
         
         print("\n✅ Dataset downloaded successfully!")
         print(f"   Location: {OUTPUT_FILE}")
@@ -4,12 +4,25 @@ import datetime
 from pathlib import Path
 from typing import Dict, List, Any
 
+def _mock_epoch() -> datetime.datetime:
+    """
+    Anchor for every generated timestamp: now, or EDITH_MOCK_EPOCH (unix seconds or an
+    ISO datetime) to generate the exact same mock data on every run.
+    """
+    epoch = os.getenv("EDITH_MOCK_EPOCH")
+    if not epoch:
+        return datetime.datetime.now()
+    if epoch.isdigit():
+        return datetime.datetime.fromtimestamp(int(epoch))
+    return datetime.datetime.fromisoformat(epoch)
+
+# Read the clock once; all mock timestamps are offsets from the same instant
+_NOW = _mock_epoch().replace(second=0, microsecond=0)
+
 # ISO Format helper
 def get_time(day_offset: int, hour: int, minute: int) -> str:
     """Returns an ISO timestamp relative to today."""
-    now = datetime.datetime.now()
-    target = now + datetime.timedelta(days=day_offset)
-    target = target.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    target = (_NOW + datetime.timedelta(days=day_offset)).replace(hour=hour, minute=minute)
     # Adding a dummy timezone offset for realism (-08:00 PST)
     return target.isoformat() + "-08:00"
 
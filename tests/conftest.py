@@ -1,6 +1,6 @@
 import pytest
 import os
-import shutil
+import copy
 from datetime import datetime, timedelta
 from typing import List, Dict
 
@@ -8,24 +8,19 @@ from edith.config import EmailAssistantConfig
 from edith.services.email.rag import EmailRAGSystem
 from edith.services.email.filter.filter import EmailFilter
 from edith.mocks.email import DummyEmailFetcher
-from tests.factories import get_dummy_data, get_dummy_live_data
+from tests.factories import get_dummy_data, get_dummy_live_data, get_dummy_live_arrays
 
 @pytest.fixture(scope="session")
-def test_config():
-    """Sets up the test configuration and cleans up DB after tests."""
+def test_config(tmp_path_factory):
+    """Sets up the test configuration with a fresh, session-private Chroma DB directory."""
     # Force Test Environment
     os.environ["EDITH_ENV"] = "test"
     config = EmailAssistantConfig()
     
-    # Pre-test cleanup
-    if os.path.exists(config.chroma_db_path):
-        shutil.rmtree(config.chroma_db_path)
-        
-    yield config
+    # pytest creates (and later prunes) the directory, so runs never see a stale index
+    config.chroma_db_path = str(tmp_path_factory.mktemp("chroma_db"))
     
-    # Post-test cleanup
-    if os.path.exists(config.chroma_db_path):
-        shutil.rmtree(config.chroma_db_path)
+    return config
 
 @pytest.fixture(scope="session")
 def rag_system(test_config):
@@ -33,7 +28,11 @@ def rag_system(test_config):
     if not test_config.gemini_api_key:
         pytest.skip("GEMINI_API_KEY not found in environment")
 
-    rag = EmailRAGSystem(test_config)
+    # The offline tests only read a handful of mock emails: an in-memory Chroma (still encrypted
+    # at rest, still queried through the same code) skips the on-disk SQLite store entirely
+    rag_config = copy.copy(test_config)
+    rag_config.chroma_in_memory = True
+    rag = EmailRAGSystem(rag_config)
     
     # Index Dummy Data from Mocks
     fetcher = DummyEmailFetcher(test_config)
@@ -52,6 +51,44 @@ def email_filter(test_config):
     
     return filter
 
+@pytest.fixture(scope="session")
+def live_emails(test_config):
+    """
+    Fetches the last few real Gmail emails once for every live test.
+    Needs 'credentials.json' and a 'token.json' from authenticating locally via main.py.
+    """
+    if not os.path.exists(test_config.gmail_credentials_path):
+        pytest.skip("Skipping live test: credentials.json not found")
+    
+    # Check for token.json to avoid interactive auth prompt hanging the test
+    if not os.path.exists("token.json"):
+        pytest.skip("Skipping live test: token.json not found. Run 'python main.py' to authenticate first.")
+    
+    # Imported only once the live prerequisites are met, so offline runs never load the Gmail client
+    from edith.services.email.fetcher import EmailFetcher
+    
+    # Force mock data OFF (on a copy, the offline fixtures keep theirs) to ensure we hit real Gmail
+    live_config = copy.copy(test_config)
+    live_config.use_mock_data = False
+    
+    fetcher = EmailFetcher(live_config)
+    if not fetcher.authenticate():
+        pytest.fail("Authentication failed despite token.json existing.")
+    
+    # Fetch a small batch to keep tests fast
+    emails, _ = fetcher.get_emails(max_results=5)
+    return emails
+
+@pytest.fixture(scope="session")
+def live_rag(test_config, email_filter, live_emails):
+    """RAG system over the relevant live emails, on the on-disk test Chroma DB, indexed once"""
+    relevant_emails = email_filter.filter_relevant_emails(live_emails)
+    print(f"\n   🔍 Found {len(relevant_emails)} relevant emails.")
+    
+    rag = EmailRAGSystem(test_config)
+    rag.index_emails(relevant_emails)
+    return rag
+
 @pytest.fixture(scope="session")
 def dummy_emails(test_config):
     """Returns dummy emails from both old factories and new mocks for compatibility"""
@@ -63,6 +100,22 @@ def dummy_emails(test_config):
 def dummy_live_emails():
     return get_dummy_live_data()
 
+@pytest.fixture(scope="session")
+def dummy_live_arrays():
+    """Columns (ids, subjects, bodies, is_relevant) of the same live emails as dummy_live_emails"""
+    return get_dummy_live_arrays()
+
+@pytest.fixture(scope="session")
+def dummy_live_spam_predictions(email_filter, dummy_live_emails):
+    """ML spam verdicts of every live email, classified in one batched call shared by the spam tests"""
+    return email_filter._is_spam_ml_batch(dummy_live_emails)
+
+@pytest.fixture(scope="session")
+def dummy_live_relevance(email_filter, dummy_live_emails):
+    """Heuristic relevance of every live email, scored once and shared by the spam tests"""
+    cutoffs = email_filter._recency_cutoffs()
+    return [email_filter._is_relevant(email, cutoffs) for email in dummy_live_emails]
+
 @pytest.fixture(scope="session")
 def dummy_single_email():
     return get_dummy_live_data(1)[0] # only one
@@ -1,4 +1,5 @@
 from functools import wraps
+import numpy as np
 
 def spam_metrics(test_fn):
     @wraps(test_fn)
@@ -10,17 +11,20 @@ def spam_metrics(test_fn):
             "correct": 0,
         }
 
+        def record_many(expected_is_spam, predicted_is_spam):
+            """Records a whole column of samples at once with vectorized comparisons"""
+            expected = np.asarray(expected_is_spam, dtype=bool)
+            predicted = np.asarray(predicted_is_spam, dtype=bool)
+            metrics["total"] += expected.size
+            metrics["correct"] += int(np.count_nonzero(expected == predicted))
+            metrics["false_pos"] += int(np.count_nonzero(predicted & ~expected))
+            metrics["false_neg"] += int(np.count_nonzero(~predicted & expected))
+
         def record(expected_is_spam: bool, predicted_is_spam: bool):
-            metrics["total"] += 1
-            if expected_is_spam == predicted_is_spam:
-                metrics["correct"] += 1
-            else:
-                if predicted_is_spam and not expected_is_spam:
-                    metrics["false_pos"] += 1
-                elif not predicted_is_spam and expected_is_spam:
-                    metrics["false_neg"] += 1
+            record_many([expected_is_spam], [predicted_is_spam])
 
         wrapper._record = record
+        wrapper._record_many = record_many
         try:
             test_fn(*args, **kwargs)
         finally:
@@ -38,4 +42,4 @@ def spam_metrics(test_fn):
                 f"\n  total samples  : {metrics['total']}\n"
             )
 
-    return wrapper
\ No newline at end of file
+    return wrapper
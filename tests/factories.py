@@ -1,14 +1,31 @@
+import os
+import importlib.util
+from copy import deepcopy
 from datetime import datetime, timedelta
-from typing import List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 
 from edith.lib.shared.models.email import EmailMessage
 
+LIVE_EMAILS_CSV = 'tests/datasets/full_emails_dataset.csv'
+# Optional columnar copy of the CSV, see scripts/convert_dataset.py
+LIVE_EMAILS_PARQUET = 'tests/datasets/full_emails_dataset.parquet'
+# The only dataset columns the factories read
+LIVE_EMAIL_COLUMNS = ['id', 'subject', 'body', 'category_id']
+
 def get_dummy_data() -> List[EmailMessage]:
     """Generates a diverse set of dummy emails for testing RAG."""
+    # Built once per session (so dates are stable); callers get their own deep copies to mutate
+    # (including the to/cc/labels lists and headers dicts)
+    return deepcopy(list(_build_dummy_data()))
+
+@lru_cache(maxsize=1)
+def _build_dummy_data() -> Tuple[EmailMessage, ...]:
     base_date = datetime.now()
     
-    return [
+    return (
         # Scenario 1: Work Project Deadline
         EmailMessage(
             id="work_1",
@@ -19,6 +36,7 @@ def get_dummy_data() -> List[EmailMessage]:
             is_relevant=True,
             account_type="work",
             cc_emails=[],
+            headers=[],
             is_unread=False,
             to_emails=[],
             thread_id=None
@@ -82,27 +100,52 @@ def get_dummy_data() -> List[EmailMessage]:
             is_unread=True,
             to_emails=[],
             thread_id=None
-        )
-    ]
+        ),
+    )
     
+@lru_cache(maxsize=1)
+def _read_emails_csv() -> pd.DataFrame:
+    """Parses the live emails dataset once per session (callers must not mutate the frame)"""
+    has_pyarrow = importlib.util.find_spec('pyarrow') is not None
+    if has_pyarrow and _parquet_is_fresh():
+        # Written by scripts/convert_dataset.py: typed columns, no CSV parsing at all
+        emails_df = pd.read_parquet(LIVE_EMAILS_PARQUET, columns=LIVE_EMAIL_COLUMNS)
+    else:
+        # PyArrow's multithreaded reader is much faster on the long body column, when installed
+        engine = 'pyarrow' if has_pyarrow else 'c'
+        emails_df = pd.read_csv(LIVE_EMAILS_CSV, engine=engine, usecols=LIVE_EMAIL_COLUMNS)
+    # Promotions, Social Media and Spam (categories 1-3) are irrelevant; computed once for the whole column
+    emails_df['is_relevant'] = ~emails_df['category_id'].between(1, 3)
+    return emails_df
+
+def _parquet_is_fresh() -> bool:
+    """True when a Parquet copy exists and is not older than the CSV it was converted from"""
+    if not os.path.exists(LIVE_EMAILS_PARQUET):
+        return False
+    return not os.path.exists(LIVE_EMAILS_CSV) or os.path.getmtime(LIVE_EMAILS_PARQUET) >= os.path.getmtime(LIVE_EMAILS_CSV)
+
 def get_dummy_live_data(limit : Optional[int] = None) -> List[EmailMessage]:
     """Gets dummy live data from Huggingface dataset"""
     
-    emails_df = pd.read_csv('tests/datasets/full_emails_dataset.csv')
+    # head() slices without materializing every row; the columns are then zipped directly
+    # instead of boxing each row into a Series (iterrows)
+    emails_df = _read_emails_csv()
+    if limit is not None:
+        emails_df = emails_df.head(limit)
     live_emails = []
     base_date = datetime.now()
     
-    iterrows = list(emails_df.iterrows())
-    limit = limit if limit is not None else len(iterrows)
-    
-    for i in range(limit):
-        _, row = iterrows[i]
-        is_relevant = False if 1 <= row['category_id'] <= 3 else True # False if category is Promotions, Social Media, or Spam
+    for email_id, subject, body, is_relevant in zip(
+        emails_df['id'].tolist(),
+        emails_df['subject'].tolist(),
+        emails_df['body'].tolist(),
+        emails_df['is_relevant'].tolist()
+    ):
         live_emails.append(EmailMessage(
-            id=row['id'],
-            subject=row['subject'],
+            id=email_id,
+            subject=subject,
             sender="test@live_emails.com",
-            body=row['body'],
+            body=body,
             date=base_date,
             is_relevant=is_relevant,
             account_type="personal",
@@ -114,3 +157,19 @@ def get_dummy_live_data(limit : Optional[int] = None) -> List[EmailMessage]:
         ))
     
     return live_emails
+
+def get_dummy_live_arrays(limit : Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Same rows as get_dummy_live_data, as columns: 'ids', 'subjects' and 'bodies' (object arrays)
+    and 'is_relevant' (bool array), for tests that only need text and labels.
+    """
+    emails_df = _read_emails_csv()
+    if limit is not None:
+        emails_df = emails_df.head(limit)
+    
+    return {
+        'ids': emails_df['id'].to_numpy(dtype=object),
+        'subjects': emails_df['subject'].to_numpy(dtype=object),
+        'bodies': emails_df['body'].to_numpy(dtype=object),
+        'is_relevant': emails_df['is_relevant'].to_numpy(dtype=bool),
+    }
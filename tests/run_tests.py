@@ -1,8 +1,18 @@
 #!/usr/bin/env python3
 
 if __name__ == "__main__":
+    import os
     import sys
+    import importlib.util
     import pytest
     print("🚀 Running automated test suite via pytest...")
-    # Run all tests in the 'tests/' directory with verbose output
-    sys.exit(pytest.main(["-v", "tests/"]))
\ No newline at end of file
+    # Run all tests in the 'tests/' directory with verbose output, without the .pytest_cache I/O
+    args = ["-v", "-p", "no:cacheprovider", "tests/"]
+
+    # Spread test files over CPU cores when pytest-xdist is installed; files stay whole on one
+    # worker so their session fixtures are built once. PYTEST_WORKERS=0 runs in a single process.
+    workers = os.getenv("PYTEST_WORKERS", "auto")
+    if workers != "0" and importlib.util.find_spec("xdist"):
+        args += ["-n", workers, "--dist", "loadfile"]
+
+    sys.exit(pytest.main(args))
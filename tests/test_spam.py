@@ -1,16 +1,14 @@
 import pytest
+import numpy as np
 from tests.decorators.spam_metrics import spam_metrics
 pytestmark = pytest.mark.offline
 
-def test_get_true_metrics(dummy_live_emails):
-    true_pos = true_neg = 0
-    for email in dummy_live_emails:
-        if email.is_relevant:
-            true_pos += 1
-        else:
-            true_neg += 1
+def test_get_true_metrics(dummy_live_arrays):
+    labels_relevant = dummy_live_arrays['is_relevant']
+    true_pos = int(np.count_nonzero(labels_relevant))
+    true_neg = len(labels_relevant) - true_pos
     
-    print(f'{test_get_true_metrics.__name__} - Got {len(dummy_live_emails)} live email dummy data.\nTP (True Positives): {true_pos}\nTN (True Negatives): {true_neg}')
+    print(f'{test_get_true_metrics.__name__} - Got {len(labels_relevant)} live email dummy data.\nTP (True Positives): {true_pos}\nTN (True Negatives): {true_neg}')
 
 # def test_single_spam_ml_detection(email_filter, dummy_single_email):
 #     """Tests Spam Detection ML LLM service from Email Filter service if it can identify spam/no spam on single email"""
@@ -20,14 +18,13 @@ def test_get_true_metrics(dummy_live_emails):
 # --- Testing Spam Detection using DistillBERT --- 
 
 @spam_metrics
-def test_spam_ml_detection(email_filter, dummy_live_emails):
+def test_spam_ml_detection(dummy_live_arrays, dummy_live_spam_predictions):
     """Tests Spam Detection ML LLM service from Email Filter service if it can detect spam emails correctly"""
-    for email in dummy_live_emails:
-        is_spam = email_filter._is_spam_ml(email)
-        test_spam_ml_detection._record(
-            expected_is_spam=is_spam,
-            predicted_is_spam=not email.is_relevant,
-        )
+    labels_relevant = dummy_live_arrays['is_relevant']
+    test_spam_ml_detection._record_many(
+        expected_is_spam=dummy_live_spam_predictions,
+        predicted_is_spam=~labels_relevant,
+    )
 
 # @spam_metrics
 # def test_spam_heuristics_detection(email_filter, dummy_live_emails):
@@ -41,71 +38,41 @@ def test_spam_ml_detection(email_filter, dummy_live_emails):
 #             predicted_is_spam=email.is_relevant,
 #         )
 @spam_metrics
-def test_spam_ml_heuristics_detection(email_filter, dummy_live_emails):
+def test_spam_ml_heuristics_detection(dummy_live_arrays, dummy_live_spam_predictions, dummy_live_relevance):
     """Tests ML LLM detection first and pass the rest of the relevant ones through heuristics filtering for spam emails or not"""
-
-    relevant_emails = []
-    
-    for i, email in enumerate(dummy_live_emails):
-        is_spam = email_filter._is_spam_ml(email)
-        if not is_spam:
-            relevant_emails.append(i)
-        else:
-            test_spam_ml_heuristics_detection._record(
-                expected_is_spam=not is_spam,
-                predicted_is_spam=email.is_relevant,
-            )   
-        
-    
-    # after getting the emails that are not spam from ML filtering,
-    # filter using heuristic scoring
-    
-    for i in relevant_emails:
-        email = dummy_live_emails[i]
-        is_relevant = email_filter._is_relevant(email)
-        test_spam_ml_heuristics_detection._record(
-            expected_is_spam=is_relevant,
-            predicted_is_spam=email.is_relevant,
-        )
+    labels_relevant = dummy_live_arrays['is_relevant']
+    is_spam = np.asarray(dummy_live_spam_predictions, dtype=bool)
+    
+    # emails flagged as spam by ML filtering are recorded as such (not is_spam == False),
+    # the emails that are not spam are then filtered using heuristic scoring
+    test_spam_ml_heuristics_detection._record_many(
+        expected_is_spam=~is_spam & np.asarray(dummy_live_relevance, dtype=bool),
+        predicted_is_spam=labels_relevant,
+    )
         
         
 @spam_metrics
-def test_spam_heuristics_ml_detection(email_filter, dummy_live_emails):
+def test_spam_heuristics_ml_detection(dummy_live_arrays, dummy_live_spam_predictions, dummy_live_relevance):
     """Tests heuristics filtering first and pass the rest of the relevant ones through ML LLM detection for spam emails or not"""
-
-    relevant_emails = []
-    
-    for i, email in enumerate(dummy_live_emails):
-        is_relevant = email_filter._is_relevant(email)
-        if is_relevant:
-            relevant_emails.append(i)
-        else:
-            test_spam_heuristics_ml_detection._record(
-                expected_is_spam=is_relevant,
-                predicted_is_spam=email.is_relevant,
-            )
-    
-    # after getting the emails that are not spam from heuristics filtering,
-    # filter using ML detection
-    
-    for i in relevant_emails:
-        email = dummy_live_emails[i]
-        is_spam = email_filter._is_spam_ml(email)
-        test_spam_heuristics_ml_detection._record(
-            expected_is_spam=not is_spam,
-            predicted_is_spam=email.is_relevant,
-        )
+    labels_relevant = dummy_live_arrays['is_relevant']
+    is_relevant = np.asarray(dummy_live_relevance, dtype=bool)
+    
+    # emails rejected by heuristics filtering are recorded as such (is_relevant == False),
+    # the emails that pass heuristics are then filtered using ML detection
+    test_spam_heuristics_ml_detection._record_many(
+        expected_is_spam=is_relevant & ~np.asarray(dummy_live_spam_predictions, dtype=bool),
+        predicted_is_spam=labels_relevant,
+    )
         
 @spam_metrics
-def test_spam_heuristics_ml_combined_detection(email_filter, dummy_live_emails):
+def test_spam_heuristics_ml_combined_detection(dummy_live_arrays, dummy_live_spam_predictions, dummy_live_relevance):
     """Tests heuristics filtering first and ML LLM detection TOGETHER for spam emails or not"""
-    
-    for email in dummy_live_emails:
-        is_relevant = email_filter._is_relevant(email) or not email_filter._is_spam_ml(email)
-        test_spam_heuristics_ml_combined_detection._record(
-            expected_is_spam=is_relevant,
-            predicted_is_spam=email.is_relevant,
-        )
+    labels_relevant = dummy_live_arrays['is_relevant']
+    is_relevant = np.asarray(dummy_live_relevance, dtype=bool) | ~np.asarray(dummy_live_spam_predictions, dtype=bool)
+    test_spam_heuristics_ml_combined_detection._record_many(
+        expected_is_spam=is_relevant,
+        predicted_is_spam=labels_relevant,
+    )
     
 
 # --- Testing Spam Detection using Zero Shot Classification with MNLI --- 